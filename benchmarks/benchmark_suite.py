@@ -0,0 +1,259 @@
+"""
+Offline benchmark suite over the real sheet and synthetic datasets
+
+    python -m benchmarks.benchmark_suite --sizes 1000 100000 -o results.json
+    python -m benchmarks.benchmark_suite --sizes 1000 100000 --save-baseline baseline.json
+    python -m benchmarks.benchmark_suite --sizes 1000 100000 --baseline baseline.json
+
+Datasets: "microbes" is data/microbes.xlsx, numbers are synthetic sizes (data/synthetic_dataset.py)
+written to a temporary file in --format. Cases, timings in ms:
+    load_dataset.parse        typed chunked parse of the file (data/dataset_loader.py)
+    load_dataset.cached       load_dataset() hitting the pickled DataFrame cache
+    game_dataset.init         GameDataset(df)
+    game_dataset.properties   get_properties()
+    engine.init               compatibility graph, generator and popularity
+    generate_game             GameEngine.new_game (what MicrobesGrid.generate_game runs), with layouts tried
+    check_answer              GameEngine.check with random names
+    search.build, search.query  SpeciesSearch index and prefix / abbreviation / fuzzy queries
+
+A case regresses when its median is more than --tolerance slower than in the baseline
+and slower by at least NOISE_MS. Regressions make the exit code 1.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from data.data_utils import get_dataset, get_xlsx_file, load_dataset
+from data.dataset_loader import load_frame
+from data.game_dataset import GameDataset
+from data.species_search import SpeciesSearch
+from data.synthetic_dataset import get_synthetic_frame, write_frame
+from engine.game_engine import GameEngine
+
+RESULTS_VERSION = 1
+# Differences below this are timer noise on fast cases
+NOISE_MS = 0.05
+# Synthetic sizes from here on run the slow cases once
+LARGE_SIZE = 100000
+
+
+def get_stats(timings: list) -> dict:
+    timings = sorted(timings)
+
+    return {
+        "runs": len(timings),
+        "median_ms": round(timings[len(timings) // 2], 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        "min_ms": round(timings[0], 4),
+        "mean_ms": round(sum(timings) / len(timings), 4),
+    }
+
+
+def time_calls(call, repeat: int) -> tuple:
+    """
+    Returns (stats, result of the last call)
+    """
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return (get_stats(timings), result)
+
+
+def run_dataset(path: str, repeat: int, games: int, queries: int, seed: int) -> dict:
+    """
+    Returns {case: stats} for one dataset file
+    """
+
+    results = {}
+    os.environ["MICROBES_GRID_DATA"] = path
+
+    results["load_dataset.parse"], df = time_calls(lambda: load_frame(path), repeat)
+    # First call parses and writes the cache
+    load_dataset()
+    results["load_dataset.cached"], df = time_calls(load_dataset, max(repeat, 3))
+
+    results["game_dataset.init"], dataset = time_calls(lambda: GameDataset(df), repeat)
+    results["game_dataset.properties"], _ = time_calls(dataset.get_properties, repeat)
+    dataset.drop_frame()
+
+    results["engine.init"], engine = time_calls(lambda: GameEngine(dataset), repeat)
+
+    timings = []
+    tries = []
+    for game_seed in range(seed, seed + games):
+        start = time.perf_counter()
+        engine.new_game(game_seed)
+        timings.append((time.perf_counter() - start) * 1000)
+        tries.append(engine.last_tries)
+    results["generate_game"] = get_stats(timings)
+    results["generate_game"]["tries_mean"] = round(sum(tries) / len(tries), 2)
+    results["generate_game"]["tries_max"] = max(tries)
+
+    rng = random.Random(seed)
+    names = dataset.species_index.names
+    timings = []
+    engine.new_game(seed)
+    for _ in range(queries):
+        row, col = rng.randrange(engine.rows), rng.randrange(engine.cols)
+        # Half of the guesses are valid for the cell
+        members = dataset.species_index.ids_from_mask(engine.state.puzzle.intersections[row][col])
+        name = names[rng.choice(members)] if members and rng.random() < 0.5 else rng.choice(names)
+        start = time.perf_counter()
+        engine.check(row, col, name)
+        timings.append((time.perf_counter() - start) * 1000)
+        if engine.state.board.filled >= engine.rows * engine.cols - 1:
+            engine.new_game(rng.randrange(2**32))
+    results["check_answer"] = get_stats(timings)
+
+    results["search.build"], search = time_calls(lambda: SpeciesSearch(dataset.all_species), repeat)
+    samples = [rng.choice(names) for _ in range(queries)]
+    texts = []
+    for index, name in enumerate(samples):
+        genus, _, epithet = name.partition(" ")
+        # Prefix, abbreviation and one dropped character in turn
+        texts.append((name[: rng.randint(1, 8)], f"{genus[0]}. {epithet[:4]}", name[:3] + name[4:])[index % 3])
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        search.search(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    results["search.query"] = get_stats(timings)
+
+    results["species"] = len(names)
+    results["properties"] = len(dataset.properties)
+
+    return results
+
+
+def run_suite(args: argparse.Namespace) -> dict:
+    datasets = {}
+    # Synthetic rows resample this frame, loaded before the cases point MICROBES_GRID_DATA elsewhere
+    if args.sizes:
+        get_dataset()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Private cache, the user cache and source stay untouched
+        os.environ["MICROBES_GRID_CACHE_DIR"] = directory
+
+        if not args.no_microbes:
+            print("microbes ...", file=sys.stderr, flush=True)
+            datasets["microbes"] = run_dataset(get_xlsx_file(), args.repeat, args.games, args.queries, args.seed)
+
+        for size in args.sizes:
+            print(f"{size} ...", file=sys.stderr, flush=True)
+            path = os.path.join(directory, f"synthetic-{size}.{args.format}")
+            write_frame(get_synthetic_frame(size, args.seed), path)
+            repeat = 1 if size >= LARGE_SIZE else args.repeat
+            datasets[str(size)] = run_dataset(path, repeat, args.games, args.queries, args.seed)
+            os.remove(path)
+
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "format": args.format,
+            "seed": args.seed,
+        },
+        "datasets": datasets,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns (dataset, case, baseline ms, current ms, ratio, regressed) for every case in both
+    """
+
+    rows = []
+    for name, cases in results["datasets"].items():
+        base_cases = baseline.get("datasets", {}).get(name, {})
+        for case, stats in cases.items():
+            base = base_cases.get(case)
+            if not isinstance(stats, dict) or not isinstance(base, dict):
+                continue
+            current, previous = stats["median_ms"], base["median_ms"]
+            ratio = current / previous if previous else float("inf")
+            regressed = current > previous * (1 + tolerance) and current - previous >= NOISE_MS
+            rows.append((name, case, previous, current, ratio, regressed))
+
+    return rows
+
+
+def format_results(results: dict) -> str:
+    lines = []
+    for name, cases in results["datasets"].items():
+        lines.append(f"{name}: {cases['species']} species, {cases['properties']} properties")
+        for case, stats in cases.items():
+            if not isinstance(stats, dict):
+                continue
+            line = f"  {case:<24} median {stats['median_ms']:10.3f} ms  p95 {stats['p95_ms']:10.3f} ms  ({stats['runs']} runs)"
+            if "tries_mean" in stats:
+                line += f"  tries {stats['tries_mean']} mean, {stats['tries_max']} max"
+            lines.append(line)
+
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list) -> str:
+    lines = [f"  {'dataset':<10} {'case':<24} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, case, previous, current, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"  {name:<10} {case:<24} {previous:9.3f} ms {current:9.3f} ms {ratio - 1:+8.1%}{flag}")
+
+    return "\n".join(lines)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbes Grid benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000], help="synthetic species counts, up to 1000000")
+    parser.add_argument("--no-microbes", action="store_true", help="skip the real microbes.xlsx")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet", "arrow", "xlsx"], help="synthetic file format")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the slow cases (1 for large sizes)")
+    parser.add_argument("--games", type=int, default=200, help="generated games per dataset")
+    parser.add_argument("--queries", type=int, default=2000, help="answer checks and searches per dataset")
+    parser.add_argument("--seed", type=int, default=0, help="seed of data, games and queries")
+    parser.add_argument("-o", "--output", help="write the results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--save-baseline", help="write the results JSON as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = run_suite(args)
+    print(format_results(results))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            rows = compare(results, json.load(file), args.tolerance)
+        print(f"\nAgainst {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print(format_comparison(rows))
+        regressions = sum(row[5] for row in rows)
+        if regressions:
+            print(f"{regressions} regressions")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compact, stdlib-only game artifact (JSON) so the game can start without pandas or openpyxl
+
+Build the bundled artifact next to microbes.xlsx with:
+    python -m data.compact_dataset
+"""
+
+import json
+import os
+import sys
+from instrumentation import timed
+from .dataset_cache import get_cache_dir, get_source_key, write_atomic
+from .game_dataset import GameDataset
+from .property_rules import PropertyRules, load_rules
+from .species_table import SpeciesTable
+
+ARTIFACT_VERSION = 4
+ARTIFACT_NAME = "microbes.grid.json"
+
+
+def get_artifact_paths(source: str) -> list:
+    """
+    Freshly built artifact in the user cache first, then the one bundled next to the source
+    """
+
+    return [
+        os.path.join(get_cache_dir(), ARTIFACT_NAME),
+        os.path.join(os.path.dirname(source), ARTIFACT_NAME),
+    ]
+
+
+def dataset_to_artifact(dataset: GameDataset, source_key: dict) -> dict:
+    return {
+        "version": ARTIFACT_VERSION,
+        "source": source_key,
+        # Properties depend on the rule spec as much as on the data
+        "rules": dataset.rules.get_key(),
+        "columns": dataset.columns,
+        "species": dataset.species_index.names,
+        # Hex keeps big masks compact and avoids the int to str digit limit
+        "properties": [[label, format(mask, "x")] for label, mask in dataset.properties],
+        # Column-wise distinct values and codes, much smaller than one record per species
+        "traits": dataset.traits.to_compact(),
+    }
+
+
+def artifact_to_dataset(artifact: dict, rules: PropertyRules | None = None) -> GameDataset:
+    properties = [(label, int(mask, 16)) for label, mask in artifact["properties"]]
+
+    traits = SpeciesTable.from_compact(artifact["columns"], artifact["traits"])
+
+    return GameDataset.from_compact(
+        artifact["columns"], artifact["species"], properties, traits, rules
+    )
+
+
+def save_artifact(dataset: GameDataset, source: str, path: str) -> None:
+    artifact = dataset_to_artifact(dataset, get_source_key(source))
+    write_atomic(path, json.dumps(artifact, separators=(",", ":")).encode("utf-8"))
+
+
+def read_artifact(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            artifact = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if artifact.get("version") != ARTIFACT_VERSION:
+        return None
+
+    return artifact
+
+
+@timed("dataset.compact_load")
+def load_compact_dataset(source: str) -> GameDataset | None:
+    """
+    Returns a dataset from the first artifact matching the source content
+    Returns None if there is no usable artifact (caller falls back to the slow path)
+    A missing source (eg. artifact-only release) trusts the artifact
+    """
+
+    source_exists = os.path.exists(source)
+    rules = load_rules()
+
+    for path in get_artifact_paths(source):
+        artifact = read_artifact(path)
+        if artifact is None:
+            continue
+
+        if artifact.get("rules") != rules.get_key():
+            continue
+
+        if source_exists:
+            source_key = get_source_key(source, artifact.get("source"))
+            if source_key["sha256"] != artifact["source"].get("sha256"):
+                continue
+
+        return artifact_to_dataset(artifact, rules)
+
+    return None
+
+
+if __name__ == "__main__":
+    from .data_utils import get_source_file, load_game_dataset
+
+    source = get_source_file()
+    output = sys.argv[1] if len(sys.argv) > 1 else get_artifact_paths(source)[1]
+
+    save_artifact(load_game_dataset(), source, output)
+    print(f"Artifact written to {output}")
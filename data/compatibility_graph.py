@@ -0,0 +1,201 @@
+import bisect
+import random
+import threading
+from math import comb
+
+
+class CompatibilityGraph:
+    """
+    Precomputed pairwise intersection counts between all properties
+    Two properties are compatible (an edge) when they share at least min_common species
+    A valid 3x3 layout is a complete bipartite K3,3: every row property is compatible with every column property
+    sample() draws 3x3 layouts uniformly from layout counts per column pair, counted on first use
+    """
+
+    def __init__(self, properties: list, min_common: int = 3, count_grids: bool = True) -> None:
+        self.properties = properties
+        self.min_common = min_common
+        # 3x3 sampling and grid count, not needed for other grid sizes
+        self.count_grids = count_grids
+        self.counts = self.get_intersection_counts()
+        # Adjacency of property i as a bitmask over property indices
+        self.adjacency = self.get_adjacency()
+        # (adjacency, column pairs, cumulative layout counts), see get_pair_weights
+        self.pair_weights = None
+        # One thread counts, others (eg. the grid count printer and the first generate) wait for it
+        self.pair_lock = threading.Lock()
+
+    def get_intersection_counts(self) -> list:
+        """
+        Returns symmetric matrix (list of lists) of common species counts
+        """
+
+        masks = [prop[1] for prop in self.properties]
+        size = len(masks)
+        counts = [[0] * size for _ in range(size)]
+
+        for i in range(size):
+            counts[i][i] = masks[i].bit_count()
+            for j in range(i + 1, size):
+                common = (masks[i] & masks[j]).bit_count()
+                counts[i][j] = common
+                counts[j][i] = common
+
+        return counts
+
+    def get_adjacency(self) -> list:
+        adjacency = []
+
+        for i, row in enumerate(self.counts):
+            neighbours = 0
+            for j, common in enumerate(row):
+                # No self loops, a property can't be both row and column
+                if i != j and common >= self.min_common:
+                    neighbours |= 1 << j
+            adjacency.append(neighbours)
+
+        return adjacency
+
+    def update(self, properties: list, changed: list) -> None:
+        """
+        Follows changed memberships of some properties, the property list keeps its layout
+        Only the rows and columns of changed properties are recounted
+        """
+
+        self.properties = properties
+        masks = [prop[1] for prop in properties]
+        for i in changed:
+            for j, mask in enumerate(masks):
+                common = (masks[i] & mask).bit_count()
+                self.counts[i][j] = common
+                self.counts[j][i] = common
+
+        self.adjacency = self.get_adjacency()
+
+    def get_row_candidates(self, col_ids: tuple) -> int:
+        """
+        Returns bitmask of properties compatible with all given columns
+        Never includes the columns themselves (no self loops)
+        """
+
+        candidates = -1
+        for col_id in col_ids:
+            candidates &= self.adjacency[col_id]
+
+        return candidates
+
+    def get_grid_count(self) -> int:
+        """
+        Number of valid 3x3 grids, every K3,3 is one layout per orientation
+        """
+
+        _, _, cumulative = self.get_pair_weights()
+
+        return cumulative[-1] // 2 if cumulative else 0
+
+    def get_pair_weights(self) -> tuple:
+        """
+        Layouts per column pair i < j, taking i and j as the two smallest column properties:
+        sum over third columns k > j of comb(row candidates of i, j, k, 3)
+        Counted once on first use (O(properties^3), a matrix product per property with numpy)
+        Returns (adjacency they were counted on, pairs, cumulative layout counts)
+        """
+
+        # Kept with their adjacency, update() replaces it and so drops weights counted before
+        adjacency = self.adjacency
+        pair_weights = self.pair_weights
+        if pair_weights is not None and pair_weights[0] is adjacency:
+            return pair_weights
+
+        with self.pair_lock:
+            pair_weights = self.pair_weights
+            if pair_weights is not None and pair_weights[0] is adjacency:
+                return pair_weights
+
+            pairs = []
+            cumulative = []
+            total = 0
+            for (i, j), weight in self.count_pair_weights(adjacency):
+                total += weight
+                pairs.append((i, j))
+                cumulative.append(total)
+
+            pair_weights = (adjacency, pairs, cumulative)
+            self.pair_weights = pair_weights
+
+        return pair_weights
+
+    @staticmethod
+    def count_pair_weights(adjacency: list) -> list:
+        """
+        Returns [((i, j), layouts)] of the pairs with at least one layout
+        """
+
+        try:
+            import numpy as np
+        except ImportError:
+            return CompatibilityGraph.count_pair_weights_python(adjacency)
+
+        size = len(adjacency)
+        matrix = np.zeros((size, size), dtype=np.float32)
+        for i, neighbours in enumerate(adjacency):
+            bits = np.unpackbits(
+                np.frombuffer(neighbours.to_bytes((size + 7) // 8, "little"), dtype=np.uint8), bitorder="little"
+            )
+            matrix[i] = bits[:size]
+
+        weights = []
+        for i in range(size - 2):
+            # Only rows compatible with i count, the product runs over its neighbours alone
+            rest = matrix[i + 1 :, matrix[i] > 0]
+            # common[j, k] = properties compatible with i, j and k (exact, counts stay far below 2^24)
+            common = np.triu(rest @ rest.T, 1).astype(np.int64)
+            row = (common * (common - 1) * (common - 2) // 6).sum(axis=1)
+            weights.extend(((i, i + 1 + j), int(row[j])) for j in np.flatnonzero(row))
+
+        return weights
+
+    @staticmethod
+    def count_pair_weights_python(adjacency: list) -> list:
+        size = len(adjacency)
+        weights = []
+        for i in range(size):
+            for j in range(i + 1, size):
+                pair = adjacency[i] & adjacency[j]
+                if pair.bit_count() < 3:
+                    continue
+                weight = sum(comb((pair & adjacency[k]).bit_count(), 3) for k in range(j + 1, size))
+                if weight:
+                    weights.append(((i, j), weight))
+
+        return weights
+
+    def sample(self, rng: random.Random = random) -> tuple | None:
+        """
+        Draws a random valid layout, uniform over all layouts, without rejection
+        Column pair by its layout count (binary search), third column by its row triples, rows uniformly
+        Returns (column property indices, row property indices), None if there is no valid layout
+        """
+
+        adjacency, pairs, cumulative = self.get_pair_weights()
+        if not cumulative:
+            return None
+
+        pick = rng.randrange(cumulative[-1])
+        index = bisect.bisect_right(cumulative, pick)
+        first, second = pairs[index]
+        pair = adjacency[first] & adjacency[second]
+
+        # Position inside the pair's weight picks the third column, O(properties)
+        pick -= cumulative[index - 1] if index else 0
+        for third in range(second + 1, len(adjacency)):
+            candidates = pair & adjacency[third]
+            pick -= comb(candidates.bit_count(), 3)
+            if pick < 0:
+                break
+
+        col_ids = [first, second, third]
+        rng.shuffle(col_ids)
+        candidate_ids = [i for i in range(len(adjacency)) if candidates >> i & 1]
+
+        return (col_ids, rng.sample(candidate_ids, 3))
@@ -1,21 +1,98 @@
 import os
 import sys
-import pandas as pd
+from instrumentation import timed
+from .dataset_cache import load_cached
+from .game_dataset import GameDataset
+
+_DATASET = None
 
 
 def get_xlsx_file():
     base_path = (
         sys._MEIPASS
         if getattr(sys, "frozen", False)
-        else os.path.dirname(os.path.abspath(__file__))
+        else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     )
     return os.path.join(base_path, "data", "microbes.xlsx")
 
 
+def get_source_file() -> str:
+    """
+    Dataset file, MICROBES_GRID_DATA may point to a CSV, Parquet or Arrow file instead of the bundled sheet
+    """
+
+    return os.environ.get("MICROBES_GRID_DATA") or get_xlsx_file()
+
+
+@timed("dataset.load")
 def load_dataset():
-    xlsx_file = get_xlsx_file()
+    # pandas (and openpyxl or pyarrow) only get imported when the DataFrame is really needed
+    from .dataset_loader import SCHEMA_VERSION, load_frame
+
+    source = get_source_file()
+
+    # Parsing is slow, reuse the pickled typed DataFrame while the file and schema are unchanged
+    return load_cached(source, lambda: load_frame(source), f"microbes-typed-{SCHEMA_VERSION}")
+
+
+def get_dataset():
+    """
+    Lazily loaded DataFrame, loaded once on first call
+    """
+
+    global _DATASET
+    if _DATASET is None:
+        _DATASET = load_dataset()
+
+    return _DATASET
+
+
+def release_dataset() -> None:
+    """
+    Forgets the loaded DataFrame, the next get_dataset call loads it again
+    """
+
+    global _DATASET
+    _DATASET = None
+
+
+def load_game_dataset(fast_start: bool = False, keep_frame: bool = True) -> GameDataset:
+    """
+    Returns GameDataset with properties extracted
+    Fast start reads the compact artifact with the stdlib only and falls back to the DataFrame path
+    keep_frame=False drops the DataFrame after indexing, the game only needs the compact tables
+    """
+
+    if fast_start:
+        from .compact_dataset import load_compact_dataset
+
+        dataset = load_compact_dataset(get_source_file())
+        if dataset is not None:
+            return dataset
+
+    dataset = GameDataset(get_dataset())
+    dataset.get_properties()
+
+    if fast_start:
+        from .compact_dataset import ARTIFACT_NAME, save_artifact
+        from .dataset_cache import get_cache_dir
+
+        # Next fast start skips pandas entirely
+        try:
+            save_artifact(dataset, get_source_file(), os.path.join(get_cache_dir(), ARTIFACT_NAME))
+        except OSError:
+            pass
+
+    if not keep_frame:
+        dataset.drop_frame()
+        release_dataset()
+
+    return dataset
 
-    return pd.read_excel(xlsx_file)
 
+def __getattr__(name: str):
+    # Keeps 'from data.data_utils import DATASET' working, loaded on first access
+    if name == "DATASET":
+        return get_dataset()
 
-DATASET = load_dataset()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Callable
+
+
+def get_cache_dir() -> str:
+    """
+    Per-user cache directory, the bundled data folder may be read-only or temporary (PyInstaller)
+    MICROBES_GRID_CACHE_DIR overrides the default location
+    """
+
+    cache_dir = os.environ.get("MICROBES_GRID_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+
+    if os.name == "nt":
+        base_path = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base_path = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+
+    return os.path.join(base_path, "MicrobesGrid")
+
+
+def get_file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def get_source_key(path: str, known_key: dict | None = None) -> dict:
+    """
+    Returns {'mtime_ns', 'size', 'sha256'} of the source file
+    Hashing is skipped if mtime and size still match the known key
+    """
+
+    stat = os.stat(path)
+    key = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    if known_key and all(known_key.get(k) == v for k, v in key.items()):
+        key["sha256"] = known_key.get("sha256")
+    else:
+        key["sha256"] = get_file_hash(path)
+
+    return key
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Writes to a temp file first so a crash never leaves a half written cache
+    """
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_meta(meta_path: str) -> dict | None:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def load_cached(
+    source: str, build: Callable[[], Any], name: str, cache_dir: str | None = None
+) -> Any:
+    """
+    Returns the object built from source, using a pickle cache when the source is unchanged
+    Cache is keyed on source mtime, size and content hash, a changed file rebuilds it
+    A moved file with identical content (eg. new PyInstaller temp dir) still hits the cache
+    """
+
+    cache_dir = cache_dir or get_cache_dir()
+    cache_path = os.path.join(cache_dir, f"{name}.pkl")
+    meta_path = os.path.join(cache_dir, f"{name}.meta.json")
+
+    meta = read_meta(meta_path)
+    key = get_source_key(source, meta)
+
+    if meta and meta.get("sha256") == key["sha256"]:
+        try:
+            with open(cache_path, "rb") as file:
+                result = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            result = None
+
+        if result is not None:
+            # Same content under a new mtime, refresh so next launch skips hashing
+            if meta != key:
+                try:
+                    write_atomic(meta_path, json.dumps(key).encode("utf-8"))
+                except OSError:
+                    pass
+            return result
+
+    result = build()
+
+    # Caching is best effort, a read-only location just means no speedup
+    try:
+        write_atomic(cache_path, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        write_atomic(meta_path, json.dumps(key).encode("utf-8"))
+    except OSError:
+        pass
+
+    return result
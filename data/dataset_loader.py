@@ -0,0 +1,192 @@
+"""
+Chunked dataset loader for xlsx, CSV, Parquet and Arrow IPC with a declared schema
+
+Every reader yields DataFrame chunks. Each chunk is typed on arrival, so trait columns are
+held as small categoricals and never as a full frame of Python strings. The chunks are merged once at the end.
+Parquet and Arrow need pyarrow (optional). Arrow IPC files are memory-mapped.
+
+New formats plug in with register_reader(suffix, reader), reader(path, chunk_size) yields DataFrames
+"""
+
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING, Callable, Iterator
+from instrumentation import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Columns not listed here are traits, stored as categoricals
+# Bump SCHEMA_VERSION with any change, cached typed frames are keyed on it
+SCHEMA_VERSION = 2
+SCHEMA = {
+    # Unique per row, a categorical would only add overhead
+    "Species": "object",
+    # Whole percentages in the sheet, nullable integers keep them 48 and not 48.0
+    "GC Content": "Int64",
+    "Biosafety level": "Int64",
+}
+TRAIT_DTYPE = "category"
+# Cell texts read as missing, same as the pandas CSV and Excel defaults
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+CHUNK_SIZE = 50000
+
+READERS = {}
+
+
+def register_reader(suffix: str, reader: Callable[[str, int], Iterator]) -> None:
+    READERS[suffix.lower()] = reader
+
+
+def get_dtype(col: str, schema: dict) -> str:
+    return schema.get(col, TRAIT_DTYPE)
+
+
+def apply_schema(chunk: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Casts a chunk to the schema, numeric columns tolerate stray text (becomes missing)
+    """
+
+    import pandas as pd
+    from pandas.api.types import is_string_dtype
+
+    for col in chunk.columns:
+        dtype = get_dtype(col, schema)
+        if dtype == TRAIT_DTYPE:
+            values = chunk[col]
+            # Trait values are labels, keep them text whatever the source typed them as
+            if not is_string_dtype(values):
+                values = values.where(values.isna(), values.astype(str))
+            chunk[col] = values.astype(TRAIT_DTYPE)
+        elif dtype == "object":
+            chunk[col] = chunk[col].astype(object)
+        else:
+            values = pd.to_numeric(chunk[col], errors="coerce")
+            # A stray decimal in an integer column is rounded, casting it would fail the whole load
+            if dtype == "Int64":
+                values = values.round()
+            chunk[col] = values.astype(dtype)
+
+    return chunk
+
+
+def combine_chunks(chunks: list, schema: dict) -> pd.DataFrame:
+    """
+    Concatenates typed chunks column by column, categoricals are merged by their categories
+    """
+
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if get_dtype(col, schema) == TRAIT_DTYPE:
+            columns[col] = pd.Series(union_categoricals(parts, sort_categories=True), name=col)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+        # Chunk columns are released as soon as they are merged
+        for chunk in chunks:
+            del chunk[col]
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_xlsx(path: str, chunk_size: int) -> Iterator:
+    import openpyxl
+    import pandas as pd
+
+    # Read-only mode streams rows instead of building the whole sheet
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        # Formatted but empty cells show up as extra columns and rows in edited sheets
+        while header and header[-1] is None:
+            header.pop()
+        header = [str(col) for col in header]
+        width = len(header)
+        batch = []
+        for row in rows:
+            row = tuple(
+                None if type(value) is str and value in NA_VALUES else value for value in row[:width]
+            )
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_csv(path: str, chunk_size: int) -> Iterator:
+    import pandas as pd
+
+    # Everything is read as text, apply_schema does the typing
+    yield from pd.read_csv(path, dtype=str, keep_default_na=True, chunksize=chunk_size)
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError("Parquet and Arrow files need pyarrow (pip install pyarrow)") from error
+
+    return pyarrow
+
+
+def read_parquet(path: str, chunk_size: int) -> Iterator:
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_arrow(path: str, chunk_size: int) -> Iterator:
+    pa = import_pyarrow()
+
+    # Batches point into the mapped file, only the converted chunk is materialized
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size).to_pandas()
+
+
+register_reader(".xlsx", read_xlsx)
+register_reader(".csv", read_csv)
+register_reader(".parquet", read_parquet)
+register_reader(".arrow", read_arrow)
+register_reader(".feather", read_arrow)
+register_reader(".ipc", read_arrow)
+
+
+@timed("dataset.parse")
+def load_frame(path: str, schema: dict | None = None, chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Returns the typed DataFrame of a supported file, picked by suffix
+    """
+
+    suffix = os.path.splitext(path)[1].lower()
+    reader = READERS.get(suffix)
+    if reader is None:
+        raise ValueError(f"Unsupported dataset format {suffix!r}, expected one of {sorted(READERS)}")
+
+    schema = SCHEMA if schema is None else schema
+    chunks = [apply_schema(chunk, schema) for chunk in reader(path, chunk_size)]
+
+    return combine_chunks(chunks, schema)
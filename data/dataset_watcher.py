@@ -0,0 +1,119 @@
+"""
+Watches the dataset file and applies edits to a running GameDataset as species level diffs
+
+The file is polled (stdlib only) and parsed in a daemon thread. The diff is applied in the owner's thread
+by poll(), so the UI or service never sees a half updated dataset.
+"""
+
+import os
+import queue
+import threading
+from .dataset_loader import load_frame
+from .game_dataset import GameDataset
+from .species_table import SpeciesTable
+
+
+def get_changes(dataset: GameDataset, table: SpeciesTable, names: list) -> tuple:
+    """
+    Compares the file's species with the dataset by full name
+    Returns (added records, removed names, {name: modified record})
+    """
+
+    if list(table.columns) != dataset.columns:
+        raise ValueError("Dataset columns changed, restart to reload")
+
+    current = dataset.species_index
+    records = {name: table.get_record(species_id) for species_id, name in enumerate(names)}
+
+    added = [dict(zip(dataset.columns, record)) for name, record in records.items() if current.get_id(name) is None]
+    removed = [name for name in current.names if name not in records]
+    modified = {
+        name: dict(zip(dataset.columns, record))
+        for name, record in records.items()
+        if current.get_id(name) is not None and dataset.traits.get_record(current.get_id(name)) != record
+    }
+
+    return (added, removed, modified)
+
+
+class DatasetWatcher:
+    """
+    Polls the file's mtime and size, a change is loaded once the file stopped changing for one interval
+    """
+
+    def __init__(self, dataset: GameDataset, path: str, interval: float = 1.0) -> None:
+        self.dataset = dataset
+        self.path = path
+        self.interval = interval
+        # Parsed files waiting for poll(): (trait table, names)
+        self.loaded = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.watch, name="DatasetWatcher", daemon=True)
+        self.last_stat = self.get_stat()
+
+    def get_stat(self) -> tuple | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def watch(self) -> None:
+        pending = None
+        while not self.stop_event.wait(self.interval):
+            stat = self.get_stat()
+            if stat is None or stat == self.last_stat:
+                pending = None
+                continue
+
+            # Editors save in steps, wait until the file is stable
+            if stat != pending:
+                pending = stat
+                continue
+
+            self.last_stat = stat
+            pending = None
+            try:
+                frame = load_frame(self.path)
+                self.loaded.put((SpeciesTable.from_frame(frame), self.dataset.get_species_name_list(frame)))
+            except Exception as error:
+                # A file saved mid-edit may not parse, the next save is picked up again
+                print(f"Dataset update skipped: {error}")
+
+    def poll(self) -> dict | None:
+        """
+        Applies every loaded change, call it from the thread that owns the dataset
+        Returns the apply_changes summary, None if nothing changed
+        """
+
+        summary = None
+        while True:
+            try:
+                table, names = self.loaded.get_nowait()
+            except queue.Empty:
+                return summary
+
+            try:
+                added, removed, modified = get_changes(self.dataset, table, names)
+            except ValueError as error:
+                print(f"Dataset update skipped: {error}")
+                continue
+
+            if not (added or removed or modified):
+                continue
+
+            result = self.dataset.apply_changes(added, removed, modified)
+            if summary is not None:
+                # Several files in one poll, the merged result covers all of them
+                for key in ("added", "removed", "modified"):
+                    result[key] += summary[key]
+                result["layout_changed"] |= summary["layout_changed"]
+                result["changed"] = sorted(set(result["changed"]) | set(summary["changed"]))
+            summary = result
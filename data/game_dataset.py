@@ -1,118 +1,298 @@
-import pandas as pd
+from __future__ import annotations
+import hashlib
+from bisect import insort
+from typing import TYPE_CHECKING
+from instrumentation import timed
+from .property_rules import PropertyRules, load_rules
+from .species_index import SpeciesIndex
+from .species_table import SpeciesTable
+
+# pandas is only needed when the dataset is built from a DataFrame
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class GameDataset:
-    def __init__(self, dataset: pd.DataFrame) -> None:
+    @timed("dataset.index")
+    def __init__(self, dataset: pd.DataFrame, rules: PropertyRules | None = None) -> None:
         self.df = dataset
         self.columns = list(self.df.columns)
         self.all_species = ()
         self.properties = []
+        # Species ID is the row position in df
+        self.species_index = SpeciesIndex(self.get_species_name_list(self.df))
         self.all_species = self.get_all_species()
-        self.sphere_shape = ["Coccobacillus","Diplococcus","Staphylococcus","Streptococcus","Tetrad",]
-        self.spiral_shape = ["Spiral", "Spirillum"]
-        self.other_shape = ["Filamentous", "Pleomorphic", "Vibrio"]
-        self.skip_columns = ["Domain", "Genus", "Species"]
+        # Trait values per species ID for the Info Centre, stored column-wise
+        self.traits = SpeciesTable.from_frame(self.df)
+        self.record_cache = {}
+        self.set_property_groups(rules)
+
+    @classmethod
+    def from_compact(
+        cls, columns: list, species_names: list, properties: list, traits: SpeciesTable,
+        rules: PropertyRules | None = None,
+    ) -> GameDataset:
+        """
+        Builds a ready dataset from precomputed indexes without pandas
+        The DataFrame is loaded on first access to df
+        """
+
+        dataset = cls.__new__(cls)
+        dataset._df = None
+        dataset.columns = list(columns)
+        dataset.species_index = SpeciesIndex(species_names)
+        dataset.all_species = sorted(species_names)
+        dataset.properties = list(properties)
+        dataset.traits = traits
+        dataset.record_cache = {}
+        dataset.set_property_groups(rules)
+
+        return dataset
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            from .data_utils import get_dataset
+
+            self._df = get_dataset()
+
+        return self._df
+
+    @df.setter
+    def df(self, dataset: pd.DataFrame) -> None:
+        self._df = dataset
+
+    def drop_frame(self) -> None:
+        """
+        Releases the DataFrame once properties are extracted, species and traits live in compact tables
+        Accessing df afterwards loads it again
+        """
+
+        self._df = None
+
+    def set_property_groups(self, rules: PropertyRules | None = None) -> None:
+        # Which properties exist is declared in the rule spec (data/property_rules.py)
+        self.rules = rules or load_rules()
+        # Membership index for incremental updates, built on the first update
+        self.value_masks = None
+        self.rule_masks = None
 
     def get_all_species(self) -> list:
         # Get all species for search list
-        all_sp = self.df.apply(
-            lambda row: f"{row['Genus']} {row['Species']}", axis=1
-        ).tolist()
+        all_sp = list(self.species_index.names)
         all_sp.sort()
 
         return all_sp
 
-    def get_species_name_list(self, df: pd.DataFrame) -> pd.DataFrame:
+    def get_fingerprint(self) -> str:
         """
-        Automated name extract
-        Returns all names as list (eg. 'Vibrio cholerae')
+        Hash of property labels and members
+        Anything stored by property index (eg. puzzle catalogues) is only valid for the same fingerprint
         """
 
-        return df.apply(lambda row: f"{row['Genus']} {row['Species']}", axis=1).tolist()
+        sha = hashlib.sha256()
+        for label, mask in self.properties:
+            sha.update(f"{label}\0{mask:x}\0".encode("utf-8"))
+
+        return sha.hexdigest()
 
-    def create_property_tuple(self, col: str, prop: pd.Series) -> tuple:
+    def get_species_record(self, name: str) -> dict | None:
         """
-        Args: col is column's name, prop is pandas series (column name with value, and size (count))
-        Creates names list
-        Returns a tuple, [0]: 'column_name: *linebreak* property_value', [1]: list of names with common property values
+        Returns {column: value} of a species by full name (eg. 'Vibrio cholerae')
+        Returns None for unknown names
         """
 
-        # Get filtered df
-        prop_df = self.df[self.df[col] == prop.iloc[0]]
-        # Extract Genus Species name as list
-        prop_list = self.get_species_name_list(prop_df)
-        # Create (Label str, list) tuple
-        # Add line break (\n) for better display
-        prop_result = (f"{col}:\n{prop.iloc[0]}", prop_list)
+        record = self.record_cache.get(name)
+        if record is None:
+            species_id = self.species_index.get_id(name)
+            if species_id is None:
+                return None
+
+            record = dict(zip(self.columns, self.traits.get_record(species_id)))
+            self.record_cache[name] = record
+
+        return record
+
+    def get_species_name_list(self, df: pd.DataFrame) -> list:
+        """
+        Automated name extract, vectorized string concatenation
+        Returns all names as list (eg. 'Vibrio cholerae')
+        """
 
-        return prop_result
+        return (df["Genus"].astype(str) + " " + df["Species"].astype(str)).tolist()
 
+    @timed("properties.extract")
     def get_properties(self) -> None:
         """
-        Get all property values with at least 5 occurence (eg. in column 'Foodborne' there are at least 5 'yes')
-        Handle special property values
+        Evaluates the property rules over the trait table in one pass
+        Columns without rules give one property per value with at least min_count species (eg. 'Foodborne: Yes')
+        """
+
+        self.properties = self.rules.extract(self.traits)
+
+    # Incremental updates
+
+    def build_membership_index(self) -> None:
+        """
+        Species mask of every value of every value column (also values under min_count),
+        and of every rule property. Built once from the trait table, updates keep it current
+        """
+
+        self.value_masks = self.rules.get_value_masks(self.traits)
+        self.rule_masks = self.rules.evaluate(self.traits)
+
+    def get_indexed_properties(self) -> list:
+        """
+        Properties derived from the membership index, same labels and order as get_properties
         """
 
-        for col in self.columns:
-            # Skip some column
-            if col in self.skip_columns:
-                continue
+        return self.rules.get_properties(self.columns, self.value_masks, self.rule_masks)
 
-            # Custom functions for exception
-            if col == "Shape":
-                self.get_shape_property()
-                continue
+    def get_record_tuple(self, record: dict) -> tuple:
+        """
+        Orders a {column: value} record like the trait table, missing columns are None
+        """
 
-            if col == "GC Content":
-                self.get_gc_content_property()
-                continue
+        return tuple(record.get(col) for col in self.columns)
 
-            if col == "Pigment Production":
-                self.get_pigment_property()
-                continue
+    def get_record_name(self, record: tuple) -> str:
+        return f"{record[self.columns.index('Genus')]} {record[self.columns.index('Species')]}"
 
-            # Value counter
-            col_values = self.df.groupby(col, as_index=False).size()
+    def set_membership(self, species_id: int, record: tuple, member: bool, indices: list | None = None) -> None:
+        """
+        Sets or clears the species bit in the value masks of the record and in the masks of matching rules
+        indices limits it to some columns (eg. the changed ones), rules reading them are re-tested
+        """
 
-            # Universal function for most
-            for _, prop in col_values.iterrows():
-                # At least 5 occurence of a value
-                if prop["size"] >= 5:
-                    prop_result = self.create_property_tuple(col, prop)
-                    # Append to all properties
-                    self.properties.append(prop_result)
+        bit = 1 << species_id
+        indices = range(len(self.columns)) if indices is None else indices
 
-    # Special property values
-    def get_special_property(self, df: pd.DataFrame, prop_text: str):
-        prop_list = self.get_species_name_list(df)
-        result = (prop_text, prop_list)
-        self.properties.append(result)
+        for index in indices:
+            col = self.columns[index]
+            value = record[index]
+            if value is not None and self.rules.is_value_column(col):
+                masks = self.value_masks[col]
+                mask = masks.get(value, 0)
+                masks[value] = mask | bit if member else mask & ~bit
 
-    def get_shape_property(self) -> None:
-        rod_shape_df = self.df[self.df["Shape"] == "Rod"]
-        self.get_special_property(rod_shape_df, "Shape:\nRod")
+        columns = {self.columns[index] for index in indices}
+        matching = self.rules.get_matching_labels(dict(zip(self.columns, record)), columns)
+        for label, matches in matching.items():
+            if matches:
+                mask = self.rule_masks[label]
+                self.rule_masks[label] = mask | bit if member else mask & ~bit
 
-        sphere_shape_df = self.df[self.df["Shape"].isin(self.sphere_shape)]
-        self.get_special_property(sphere_shape_df, "Shape:\nSphere")
+    def add_species(self, record: dict) -> None:
+        record = self.get_record_tuple(record)
+        name = self.get_record_name(record)
+        if self.species_index.get_id(name) is not None:
+            raise ValueError(f"{name} is already in the dataset")
 
-        other_shape_df = self.df[self.df["Shape"].isin(self.other_shape)]
-        self.get_special_property(other_shape_df, "Shape:\nNOT Rod or Sphere")
+        species_id = self.species_index.append(name)
+        self.traits.append(record)
+        insort(self.all_species, self.species_index.names[species_id])
+        self.set_membership(species_id, record, True)
 
-    def get_gc_content_property(self) -> None:
-        less_than_40_gc_content_df = self.df[self.df["GC Content"] < 40]
-        self.get_special_property(less_than_40_gc_content_df, "GC content\n< 40%")
+    def remove_species(self, names: list) -> None:
+        """
+        Removes species by name, every mask is compacted once for the whole batch
+        """
 
-        between_40_60_gc_content_df = self.df[
-            (self.df["GC Content"] >= 40) & (self.df["GC Content"] <= 60)
-        ]
-        self.get_special_property(between_40_60_gc_content_df, "GC content:\n40-60%")
+        species_ids = []
+        for name in names:
+            species_id = self.species_index.get_id(name)
+            if species_id is None:
+                raise KeyError(name)
+            species_ids.append(species_id)
+
+        # Later species move down past every removed ID, so every mask drops the bits
+        size = len(self.species_index)
+        for masks in [self.rule_masks, *self.value_masks.values()]:
+            labels = list(masks)
+            masks.update(zip(labels, SpeciesIndex.remove_bits([masks[label] for label in labels], species_ids, size)))
+
+        self.species_index.remove(species_ids)
+        self.traits.remove(species_ids)
+        removed = set(names)
+        self.all_species = [name for name in self.all_species if name not in removed]
+        for name in removed:
+            self.record_cache.pop(name, None)
+
+    def modify_species(self, name: str, record: dict) -> set:
+        """
+        Replaces the traits of a species, only masks of changed values are touched
+        Returns the changed columns
+        """
 
-        more_than_60_gc_content_df = self.df[self.df["GC Content"] > 60]
-        self.get_special_property(more_than_60_gc_content_df, "GC content\n> 60%")
+        species_id = self.species_index.get_id(name)
+        if species_id is None:
+            raise KeyError(name)
 
-    def get_pigment_property(self) -> None:
-        not_pigmented_df = self.df[self.df["Pigment Production"] == "No"]
-        self.get_special_property(not_pigmented_df, "Pigment Production:\nNo")
+        old_record = self.traits.get_record(species_id)
+        record = self.get_record_tuple(record)
+        changed = [i for i, (old, new) in enumerate(zip(old_record, record)) if old != new]
+        if not changed:
+            return set()
+
+        new_name = self.get_record_name(record)
+        if new_name != name and self.species_index.get_id(new_name) is not None:
+            raise ValueError(f"{new_name} is already in the dataset")
+
+        self.set_membership(species_id, old_record, False, changed)
+        self.set_membership(species_id, record, True, changed)
+        self.traits.set_record(species_id, record)
+        self.record_cache.pop(name, None)
+
+        if new_name != name:
+            self.species_index.rename(species_id, new_name)
+            self.all_species.remove(name)
+            insort(self.all_species, self.species_index.names[species_id])
+
+        return {self.columns[index] for index in changed}
+
+    @timed("dataset.update")
+    def apply_changes(self, added: list = (), removed: list = (), modified: dict | None = None) -> dict:
+        """
+        Applies species changes without re-reading the whole dataset
+        added: {column: value} records, removed: names, modified: {name: record}
+        Returns a summary, 'changed' lists property indices whose members changed,
+        'layout_changed' is True when properties were added or dropped (indices shifted)
+        """
+
+        if self.value_masks is None:
+            self.build_membership_index()
+
+        # The DataFrame no longer matches, it is reloaded if anything asks for it
+        self._df = None
+
+        changed_columns = set()
+        if removed:
+            self.remove_species(removed)
+        for name, record in (modified or {}).items():
+            changed_columns |= self.modify_species(name, record)
+        for record in added:
+            self.add_species(record)
+
+        # Quantile bounds follow the column, their rules are rebuilt whenever the column's values moved
+        quantile_labels = self.rules.get_quantile_labels(
+            self.columns, None if added or removed else changed_columns
+        )
+        if quantile_labels:
+            self.rule_masks.update(self.rules.evaluate(self.traits, quantile_labels))
+
+        old_properties = self.properties
+        # Swapped in one assignment, readers in other threads see the old or the new list
+        self.properties = self.get_indexed_properties()
+
+        layout_changed = [label for label, _ in old_properties] != [label for label, _ in self.properties]
+        changed = [] if layout_changed else [
+            i for i, (old, new) in enumerate(zip(old_properties, self.properties)) if old[1] != new[1]
+        ]
 
-        pigmented_df = self.df[self.df["Pigment Production"] != "No"]
-        self.get_special_property(pigmented_df, "Pigment Production:\nYes")
+        return {
+            "added": len(added),
+            "removed": len(removed),
+            "modified": len(modified or {}),
+            "changed": changed,
+            "layout_changed": layout_changed,
+        }
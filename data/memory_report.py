@@ -0,0 +1,136 @@
+"""
+Memory of the species structures, old layout against the compact one
+
+    python -m data.memory_report --sizes 1000 10000 100000
+
+Synthetic datasets (data/synthetic_dataset.py) resample the rows of microbes.xlsx with generated unique names.
+Old: DataFrame kept resident, one list of "Genus species" strings per property, sorted name list.
+Compact: interned name table, species bitmask per property, column-coded traits, DataFrame dropped.
+Python objects are measured with tracemalloc, the DataFrame with memory_usage(deep=True).
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from array import array
+from .game_dataset import GameDataset
+from .species_index import SpeciesIndex
+from .species_table import SpeciesTable
+from .synthetic_dataset import get_synthetic_frame
+
+
+def measure(build) -> tuple:
+    """
+    Returns (result, bytes allocated by build that are still alive)
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (result, size)
+
+
+def get_report(size: int) -> dict:
+    df = get_synthetic_frame(size)
+    dataset = GameDataset(df)
+    dataset.get_properties()
+    member_ids = [SpeciesIndex.ids_from_mask(mask) for _, mask in dataset.properties]
+    genus = df["Genus"].astype(str)
+    species = df["Species"].astype(str)
+    typecode = "H" if size <= 0x10000 else "I"
+
+    def old_names() -> list:
+        return sorted((genus + " " + species).tolist())
+
+    def old_memberships() -> list:
+        # Every property builds its own name strings, like the original get_species_name_list
+        return [
+            (label, (genus.iloc[ids] + " " + species.iloc[ids]).tolist())
+            for (label, _), ids in zip(dataset.properties, member_ids)
+        ]
+
+    def compact_names() -> tuple:
+        index = SpeciesIndex((genus + " " + species).tolist())
+        return (index, sorted(index.names))
+
+    def compact_memberships() -> list:
+        # Copied, the dataset's masks already exist
+        byte_count = (size + 7) // 8
+        return [
+            (label, int.from_bytes(mask.to_bytes(byte_count, "little"), "little"))
+            for label, mask in dataset.properties
+        ]
+
+    def id_arrays() -> list:
+        return [(label, array(typecode, ids)) for (label, _), ids in zip(dataset.properties, member_ids)]
+
+    def record_tuples() -> list:
+        return [tuple(row) for row in df.astype(object).where(df.notna(), None).itertuples(index=False)]
+
+    sizes = {}
+    for name, build in (
+        ("old_names", old_names),
+        ("old_memberships", old_memberships),
+        ("compact_names", compact_names),
+        ("compact_memberships", compact_memberships),
+        ("id_array_memberships", id_arrays),
+        ("record_tuples", record_tuples),
+        ("compact_traits", lambda: SpeciesTable.from_frame(df)),
+    ):
+        result, sizes[name] = measure(build)
+        del result
+
+    sizes["dataframe"] = int(df.memory_usage(deep=True).sum())
+    sizes["old_total"] = sizes["dataframe"] + sizes["old_names"] + sizes["old_memberships"]
+    sizes["compact_total"] = sizes["compact_names"] + sizes["compact_memberships"] + sizes["compact_traits"]
+
+    return {"species": size, "properties": len(dataset.properties), "bytes": sizes}
+
+
+def format_report(report: dict) -> str:
+    sizes = report["bytes"]
+
+    def mb(value: int) -> str:
+        return f"{value / 2**20:9.2f} MB"
+
+    rows = [
+        ("names+index", sizes["old_names"], sizes["compact_names"]),
+        ("memberships", sizes["old_memberships"], sizes["compact_memberships"]),
+        ("traits", sizes["dataframe"], sizes["compact_traits"]),
+        ("total", sizes["old_total"], sizes["compact_total"]),
+    ]
+    lines = [f"{report['species']} species, {report['properties']} properties"]
+    lines.append(f"  {'':12} {'old':>12} {'compact':>12} {'saved':>7}")
+    for label, old, compact in rows:
+        lines.append(f"  {label:12} {mb(old)} {mb(compact)} {1 - compact / old:7.1%}")
+    lines.append(f"  alternatives: ID arrays {mb(sizes['id_array_memberships']).strip()}, record tuples {mb(sizes['record_tuples']).strip()}")
+
+    return "\n".join(lines)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Species structure memory report")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="species counts")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    reports = [get_report(size) for size in args.sizes]
+    if args.json:
+        print(json.dumps(reports, indent=1))
+    else:
+        print("\n\n".join(format_report(report) for report in reports))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Declarative property rules, compiled once and evaluated over the factorized trait table
+
+Spec (a dict, or a JSON file with the same shape):
+    min_count       species a value needs to become a property (value expansion only)
+    skip_columns    columns that never give properties
+    columns         {column: [rule property, ...]}, replaces the one-property-per-value expansion of that column
+    derived         [rule property, ...] appended after the column properties
+
+Rule property: {"label": str, "where": condition}
+Conditions (a leaf without "col" uses the column it is listed under):
+    {"eq": value}  {"in": [values]}  {"lt" / "le" / "gt" / "ge": number}  {"range": [low, high]} (inclusive)
+    {"quantile": [low, high]}  values between two quantiles of the column, eg. [0, 0.25] is the lowest quarter
+    {"and": [conditions]}  {"or": [conditions]}  {"not": condition}
+Missing values never match a leaf, so {"not": {"eq": "No"}} includes them.
+
+Every leaf is tested once per distinct column value, then mapped to species through the column codes,
+so extraction cost grows with rows times leaves and never rescans a DataFrame.
+"""
+
+import hashlib
+import json
+import os
+from .species_table import SpeciesTable
+
+DEFAULT_RULES = {
+    "min_count": 5,
+    "skip_columns": ["Domain", "Genus", "Species"],
+    "columns": {
+        "Shape": [
+            {"label": "Shape:\nRod", "where": {"eq": "Rod"}},
+            {"label": "Shape:\nSphere", "where": {"in": ["Coccobacillus", "Diplococcus", "Staphylococcus", "Streptococcus", "Tetrad"]}},
+            {"label": "Shape:\nNOT Rod or Sphere", "where": {"in": ["Filamentous", "Pleomorphic", "Vibrio"]}},
+        ],
+        "GC Content": [
+            {"label": "GC content\n< 40%", "where": {"lt": 40}},
+            {"label": "GC content:\n40-60%", "where": {"range": [40, 60]}},
+            {"label": "GC content\n> 60%", "where": {"gt": 60}},
+        ],
+        "Pigment Production": [
+            {"label": "Pigment Production:\nNo", "where": {"eq": "No"}},
+            {"label": "Pigment Production:\nYes", "where": {"not": {"eq": "No"}}},
+        ],
+    },
+    "derived": [],
+}
+
+LEAF_OPS = ("eq", "in", "lt", "le", "gt", "ge", "range", "quantile")
+
+
+def get_ids_mask(species_ids: list, size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for species_id in species_ids:
+        bits[species_id >> 3] |= 1 << (species_id & 7)
+
+    return int.from_bytes(bits, "little")
+
+
+def get_flags_mask(lookup: list, codes) -> int:
+    """
+    Species bitmask of the species whose code is True in lookup (one bool per code)
+    """
+
+    try:
+        import numpy as np
+    except ImportError:
+        return get_ids_mask([i for i, code in enumerate(codes) if lookup[code]], len(codes))
+
+    flags = np.asarray(lookup, dtype=bool)[np.frombuffer(codes, dtype=codes.typecode)]
+
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def get_code_masks(codes, code_count: int, min_count: int = 1) -> list:
+    """
+    Species bitmask per code, species grouped by one stable sort
+    Each mask is built from its own members, O(rows + mask bytes) instead of a row-length array per code
+    Codes with fewer than min_count species get 0
+    """
+
+    try:
+        import numpy as np
+    except ImportError:
+        members = [[] for _ in range(code_count)]
+        for species_id, code in enumerate(codes):
+            members[code].append(species_id)
+        # Sized to the last member, not to every row
+        return [get_ids_mask(ids, ids[-1] + 1) if ids and len(ids) >= min_count else 0 for ids in members]
+
+    if not len(codes):
+        return [0] * code_count
+
+    codes = np.frombuffer(codes, dtype=codes.typecode)
+    counts = np.bincount(codes, minlength=code_count)
+    # Stable sort keeps species order inside each code
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+
+    # Bytes of all masks at once: members sharing code and byte are summed (distinct bits never carry)
+    keys = sorted_codes.astype(np.int64) * ((len(codes) >> 3) + 1) + (order >> 3)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    byte_values = np.add.reduceat(np.left_shift(1, order & 7), starts).astype(np.uint8)
+    byte_positions = order[starts] >> 3
+    bounds = np.searchsorted(sorted_codes[starts], np.arange(code_count + 1))
+
+    masks = []
+    for code, count in enumerate(counts):
+        if count and count >= min_count:
+            first, last = bounds[code], bounds[code + 1]
+            data = np.zeros(byte_positions[last - 1] + 1, dtype=np.uint8)
+            data[byte_positions[first:last]] = byte_values[first:last]
+            masks.append(int.from_bytes(data.tobytes(), "little"))
+        else:
+            masks.append(0)
+
+    return masks
+
+
+class Leaf:
+    """
+    Test of a single column value
+    """
+
+    def __init__(self, col: str, op: str, arg) -> None:
+        self.col = col
+        self.op = op
+        self.arg = set(arg) if op == "in" else arg
+        self.columns = {col}
+        # Quantile bounds depend on every value of the column, a single record can't be tested alone
+        self.quantile_columns = {col} if op == "quantile" else set()
+        # Quantile bounds become a value range once the column is known
+        self.bounds = None
+
+    def prepare(self, table: SpeciesTable, cache: dict) -> None:
+        if self.op != "quantile":
+            return
+
+        # Sorted column values are shared by every quantile leaf on the column
+        data = cache.get(("sorted", self.col))
+        if data is None:
+            index = table.columns.index(self.col)
+            values = table.values[index]
+            data = cache[("sorted", self.col)] = sorted(values[code] for code in table.codes[index] if code)
+        if not data:
+            self.bounds = None
+            return
+
+        # Nearest rank, quantile 0 is the smallest value and 1 the largest
+        low, high = self.arg
+        self.bounds = (data[round(low * (len(data) - 1))], data[round(high * (len(data) - 1))])
+
+    def test(self, value) -> bool:
+        if value is None:
+            return False
+
+        op = self.op
+        arg = self.arg
+        try:
+            if op == "eq":
+                return value == arg
+            if op == "in":
+                return value in arg
+            if op == "lt":
+                return value < arg
+            if op == "le":
+                return value <= arg
+            if op == "gt":
+                return value > arg
+            if op == "ge":
+                return value >= arg
+            if op == "range":
+                return arg[0] <= value <= arg[1]
+            # quantile
+            return self.bounds is not None and self.bounds[0] <= value <= self.bounds[1]
+        except TypeError:
+            # Text in a numeric rule never matches
+            return False
+
+    def evaluate(self, table: SpeciesTable, cache: dict) -> int:
+        key = (self.col, self.op, repr(sorted(self.arg, key=str) if self.op == "in" else self.arg))
+        mask = cache.get(key)
+        if mask is None:
+            index = table.columns.index(self.col)
+            lookup = [self.test(value) for value in table.values[index]]
+            mask = cache[key] = get_flags_mask(lookup, table.codes[index])
+
+        return mask
+
+    def matches(self, record: dict) -> bool:
+        return self.test(record.get(self.col))
+
+
+class Combination:
+    """
+    and / or / not over conditions, evaluated on species masks
+    """
+
+    def __init__(self, op: str, children: list) -> None:
+        self.op = op
+        self.children = children
+        self.columns = set().union(*(child.columns for child in children))
+        self.quantile_columns = set().union(*(child.quantile_columns for child in children))
+
+    def prepare(self, table: SpeciesTable, cache: dict) -> None:
+        for child in self.children:
+            child.prepare(table, cache)
+
+    def evaluate(self, table: SpeciesTable, cache: dict) -> int:
+        masks = [child.evaluate(table, cache) for child in self.children]
+        if self.op == "not":
+            return ((1 << len(table)) - 1) & ~masks[0]
+
+        result = masks[0]
+        for mask in masks[1:]:
+            result = result & mask if self.op == "and" else result | mask
+
+        return result
+
+    def matches(self, record: dict) -> bool:
+        if self.op == "not":
+            return not self.children[0].matches(record)
+        if self.op == "and":
+            return all(child.matches(record) for child in self.children)
+
+        return any(child.matches(record) for child in self.children)
+
+
+def compile_condition(node: dict, col: str | None = None):
+    """
+    Returns the Leaf / Combination tree of a condition spec
+    Raises ValueError for malformed specs
+    """
+
+    if not isinstance(node, dict) or not node:
+        raise ValueError(f"Invalid rule condition {node!r}")
+
+    if "not" in node:
+        return Combination("not", [compile_condition(node["not"], col)])
+    for op in ("and", "or"):
+        if op in node:
+            if not node[op]:
+                raise ValueError(f"Empty '{op}' in rule condition")
+            return Combination(op, [compile_condition(child, col) for child in node[op]])
+
+    col = node.get("col", col)
+    ops = [op for op in LEAF_OPS if op in node]
+    if col is None or len(ops) != 1:
+        raise ValueError(f"Rule condition needs a column and exactly one of {LEAF_OPS}: {node!r}")
+
+    op = ops[0]
+    if op in ("range", "quantile") and len(node[op]) != 2:
+        raise ValueError(f"'{op}' needs [low, high]: {node!r}")
+
+    return Leaf(col, op, node[op])
+
+
+class PropertyRules:
+    """
+    Compiled rule spec
+    extract(table) returns the (label, species mask) properties in column order
+    """
+
+    def __init__(self, spec: dict | None = None) -> None:
+        spec = DEFAULT_RULES if spec is None else spec
+        self.spec = spec
+        self.min_count = spec.get("min_count", 5)
+        self.skip_columns = set(spec.get("skip_columns", ()))
+        # {column: [(label, condition)]}
+        self.columns = {
+            col: [(prop["label"], compile_condition(prop["where"], col)) for prop in props]
+            for col, props in spec.get("columns", {}).items()
+        }
+        self.derived = [
+            (prop["label"], compile_condition(prop["where"])) for prop in spec.get("derived", ())
+        ]
+
+    @classmethod
+    def from_file(cls, path: str) -> "PropertyRules":
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def get_key(self) -> str:
+        """
+        Hash of the spec, anything built with the rules (eg. the compact artifact) is only valid for the same key
+        """
+
+        text = json.dumps(self.spec, sort_keys=True, default=str)
+
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_rule_properties(self, columns: list) -> list:
+        """
+        Returns (label, condition) of every rule property in property order
+        """
+
+        rules = []
+        for col in columns:
+            rules.extend(self.columns.get(col, ()))
+        rules.extend(self.derived)
+
+        return rules
+
+    def is_value_column(self, col: str) -> bool:
+        # Columns without rules get one property per frequent value
+        return col not in self.skip_columns and col not in self.columns
+
+    def evaluate(self, table: SpeciesTable, labels: set | None = None) -> dict:
+        """
+        Returns {label: species mask} of every rule property, or of the given labels
+        Leaves shared by several rules are evaluated once
+        """
+
+        cache = {}
+        masks = {}
+        for label, condition in self.get_rule_properties(table.columns):
+            if labels is not None and label not in labels:
+                continue
+            condition.prepare(table, cache)
+            masks[label] = condition.evaluate(table, cache)
+
+        return masks
+
+    def get_value_masks(self, table: SpeciesTable, min_count: int = 1) -> dict:
+        """
+        Returns {column: {value: species mask}} for every value column
+        Incremental updates need every value (min_count 1), extraction only the frequent ones
+        """
+
+        value_masks = {}
+        for index, col in enumerate(table.columns):
+            if not self.is_value_column(col):
+                continue
+
+            values = table.values[index]
+            code_masks = get_code_masks(table.codes[index], len(values), min_count)
+            # Code 0 is a missing value, never a property
+            value_masks[col] = {
+                values[code]: mask for code, mask in enumerate(code_masks) if code and mask
+            }
+
+        return value_masks
+
+    def get_properties(self, columns: list, value_masks: dict, rule_masks: dict) -> list:
+        """
+        Orders value and rule masks into the property list: columns in order, values sorted, then derived
+        """
+
+        properties = []
+        for col in columns:
+            if col in self.columns:
+                properties.extend((label, rule_masks[label]) for label, _ in self.columns[col])
+            elif col in value_masks:
+                for value, mask in sorted(value_masks[col].items(), key=lambda item: item[0]):
+                    if mask.bit_count() >= self.min_count:
+                        properties.append((f"{col}:\n{value}", mask))
+        properties.extend((label, rule_masks[label]) for label, _ in self.derived)
+
+        return properties
+
+    def extract(self, table: SpeciesTable) -> list:
+        value_masks = self.get_value_masks(table, self.min_count)
+
+        return self.get_properties(table.columns, value_masks, self.evaluate(table))
+
+    def get_matching_labels(self, record: dict, columns: set | None = None) -> dict:
+        """
+        Returns {label: bool} for the rule properties of one species record
+        columns limits it to rules reading one of those columns (eg. the changed ones)
+        Quantile rules are left out, their bounds move with the column (see get_quantile_labels)
+        """
+
+        return {
+            label: condition.matches(record)
+            for label, condition in self.get_rule_properties(list(record))
+            if not condition.quantile_columns and (columns is None or condition.columns & columns)
+        }
+
+    def get_quantile_labels(self, all_columns: list, columns: set | None = None) -> set:
+        """
+        Labels of the rules with a quantile leaf on one of columns (all of them without columns)
+        Those rules are re-evaluated over the whole table after an update
+        """
+
+        return {
+            label for label, condition in self.get_rule_properties(all_columns)
+            if condition.quantile_columns and (columns is None or condition.quantile_columns & columns)
+        }
+
+
+def load_rules() -> PropertyRules:
+    """
+    Default rules, or the JSON spec MICROBES_GRID_RULES points to
+    """
+
+    path = os.environ.get("MICROBES_GRID_RULES")
+
+    return PropertyRules.from_file(path) if path else PropertyRules()
@@ -0,0 +1,115 @@
+import sys
+from typing import Iterable
+
+# Set bit positions of every byte value
+BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+class SpeciesIndex:
+    """
+    Gives every species an integer ID (its row position in the dataset)
+    Property memberships are stored as int bitmasks: bit i is set when species i is a member
+    Intersections are a single AND, counts are a popcount
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        # Interned, so every structure holding a name shares one string object
+        self.names = [sys.intern(name) for name in names]
+        self.ids = {name: species_id for species_id, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_id(self, name: str) -> int | None:
+        return self.ids.get(name)
+
+    def append(self, name: str) -> int:
+        """
+        Adds a species at the end, returns its ID
+        """
+
+        species_id = len(self.names)
+        name = sys.intern(name)
+        self.names.append(name)
+        self.ids[name] = species_id
+
+        return species_id
+
+    def remove(self, species_ids: list) -> None:
+        """
+        Removes species, later IDs move down past every removed one (IDs stay row positions)
+        """
+
+        removed = set(species_ids)
+        self.names = [name for species_id, name in enumerate(self.names) if species_id not in removed]
+        self.ids = {name: species_id for species_id, name in enumerate(self.names)}
+
+    def rename(self, species_id: int, name: str) -> None:
+        del self.ids[self.names[species_id]]
+        name = sys.intern(name)
+        self.names[species_id] = name
+        self.ids[name] = species_id
+
+    @staticmethod
+    def remove_bit(mask: int, species_id: int) -> int:
+        """
+        Drops bit species_id and shifts the higher bits down
+        """
+
+        low = mask & ((1 << species_id) - 1)
+
+        return low | (mask >> (species_id + 1) << species_id)
+
+    @staticmethod
+    def remove_bits(masks: list, species_ids: list, size: int) -> list:
+        """
+        Drops the bits of species_ids from every mask of size species, matches remove()
+        Each mask is compacted in one pass, however many species are removed
+        """
+
+        species_ids = sorted(set(species_ids))
+        try:
+            import numpy as np
+        except ImportError:
+            result = []
+            for mask in masks:
+                # Highest first, lower IDs stay valid while higher bits are dropped
+                for species_id in reversed(species_ids):
+                    mask = SpeciesIndex.remove_bit(mask, species_id)
+                result.append(mask)
+            return result
+
+        keep = np.ones(size, dtype=bool)
+        keep[species_ids] = False
+        byte_count = (size + 7) // 8
+        result = []
+        for mask in masks:
+            bits = np.unpackbits(np.frombuffer(mask.to_bytes(byte_count, "little"), dtype=np.uint8), bitorder="little")
+            kept = np.packbits(bits[:size][keep], bitorder="little")
+            result.append(int.from_bytes(kept.tobytes(), "little"))
+
+        return result
+
+    @staticmethod
+    def ids_from_mask(mask: int) -> list:
+        # Read byte by byte, clearing bits one at a time would copy a large mask for every member
+        species_ids = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        for index, byte in enumerate(data):
+            if byte:
+                base = index << 3
+                species_ids.extend([base + bit for bit in BYTE_BITS[byte]])
+
+        return species_ids
+
+    def names_from_mask(self, mask: int) -> list:
+        """
+        Resolves a mask back to names, only needed at the UI boundary
+        """
+
+        return [self.names[species_id] for species_id in self.ids_from_mask(mask)]
+
+    def contains(self, mask: int, name: str) -> bool:
+        species_id = self.ids.get(name)
+
+        return species_id is not None and bool(mask >> species_id & 1)
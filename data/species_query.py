@@ -0,0 +1,377 @@
+"""
+Reverse queries over the species traits: which species match a combination of traits
+
+    python -m data.species_query "Gram Stain: Negative AND Shape: Rod AND GC content: 40-60%"
+    python -m data.species_query "Metabolism = Aerobe AND NOT Motile: No" --offset 20 --limit 20
+
+Terms:
+    a property label, newlines written as spaces (eg. "Shape: Rod", "GC content < 40%")
+    column = value, column != value (any value, also the ones too rare to be a property)
+    column < number, <=, >, >= (numeric columns)
+Combined with AND / OR / NOT (or & | !) and parentheses, NOT binds tightest, then AND, then OR.
+Terms containing an operator word (eg. "Shape: NOT Rod or Sphere") are written in double quotes.
+Dict conditions of data/property_rules.py and {"property": label} are accepted too.
+
+Every column value has a species bitmap. Bits are in alphabetical name order, so a page of results
+is a run of set bits: counts are a popcount and a page never walks the bits before it.
+"""
+
+import argparse
+import re
+import sys
+import time
+from array import array
+from .game_dataset import GameDataset
+from .property_rules import Combination, Leaf, compile_condition, get_code_masks
+
+# Columns with more distinct values than this (eg. Species) get no value bitmaps
+MAX_VALUES = 1000
+# Leaf masks kept between queries
+CACHE_SIZE = 1024
+PAGE_SIZE = 50
+
+COMPARISONS = {"<=": "le", ">=": "ge", "!=": "ne", "=": "eq", "<": "lt", ">": "gt"}
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(&|\||!(?!=))|\b(AND|OR|NOT)\b)')
+KEYWORDS = {"&": "AND", "|": "OR", "!": "NOT"}
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class PropertyTerm:
+    """
+    Query term naming a whole property
+    """
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.columns = set()
+        self.quantile_columns = set()
+
+
+def tokenize(text: str) -> list:
+    """
+    Returns ("(" / ")" / "AND" / "OR" / "NOT" / "TERM", text) tokens
+    """
+
+    tokens = []
+    position = 0
+    term = ""
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None or match.end() == position:
+            term += text[position]
+            position += 1
+            continue
+
+        if term.strip():
+            tokens.append(("TERM", term.strip()))
+        term = ""
+        opening, closing, quoted, symbol, keyword = match.groups()
+        if opening:
+            tokens.append(("(", opening))
+        elif closing:
+            tokens.append((")", closing))
+        elif quoted is not None:
+            tokens.append(("TERM", quoted))
+        elif symbol:
+            tokens.append((KEYWORDS[symbol], symbol))
+        elif keyword:
+            tokens.append((keyword, keyword))
+        position = match.end()
+    if term.strip():
+        tokens.append(("TERM", term.strip()))
+
+    return tokens
+
+
+def get_page_ranks(mask: int, offset: int, limit: int) -> list:
+    """
+    Bit positions of the set bits number offset .. offset + limit - 1 in mask
+    """
+
+    if offset:
+        # Lowest position with offset set bits below it, found by popcounts of prefixes
+        low, high = 0, mask.bit_length()
+        while low < high:
+            middle = (low + high) // 2
+            if (mask & ((1 << middle) - 1)).bit_count() < offset:
+                low = middle + 1
+            else:
+                high = middle
+        mask >>= low
+        base = low
+    else:
+        base = 0
+
+    ranks = []
+    while mask and len(ranks) < limit:
+        lowest = mask & -mask
+        position = lowest.bit_length() - 1
+        ranks.append(base + position)
+        mask ^= lowest
+
+    return ranks
+
+
+class SpeciesQuery:
+    """
+    Bitmap index over one GameDataset, build a new one after the dataset changed
+    """
+
+    def __init__(self, dataset: GameDataset) -> None:
+        self.dataset = dataset
+        self.names = dataset.all_species
+        traits = dataset.traits
+        self.size = len(traits)
+        self.all_mask = (1 << self.size) - 1
+
+        # Species ID order to alphabetical rank order
+        rank_of = dataset.species_index.ids
+        order = [rank_of[name] for name in self.names]
+
+        # {column: {value: mask}}, only kept per column for the value lookups
+        self.value_masks = {}
+        for index, col in enumerate(traits.columns):
+            values = traits.values[index]
+            if len(values) > MAX_VALUES:
+                continue
+            codes = traits.codes[index]
+            ranked = array(codes.typecode, [codes[species_id] for species_id in order])
+            code_masks = get_code_masks(ranked, len(values))
+            self.value_masks[col] = {values[code]: mask for code, mask in enumerate(code_masks) if code and mask}
+
+        self.columns = {normalize(col): col for col in self.value_masks}
+        self.labels = {normalize(label): label for label, _ in dataset.properties}
+        self.rule_conditions = dict(dataset.rules.get_rule_properties(dataset.columns))
+        self.cache = {}
+
+    # Parsing
+
+    def parse(self, text: str):
+        """
+        Returns the condition tree of a query text
+        Raises ValueError for unknown terms and bad syntax
+        """
+
+        tokens = tokenize(text)
+        if not tokens:
+            raise ValueError("Empty query")
+
+        position = 0
+
+        def peek() -> str | None:
+            return tokens[position][0] if position < len(tokens) else None
+
+        def take(kind: str) -> str:
+            nonlocal position
+            if peek() != kind:
+                found = tokens[position][1] if position < len(tokens) else "end of query"
+                raise ValueError(f"Expected {kind} at {found!r}")
+            position += 1
+            return tokens[position - 1][1]
+
+        def parse_or():
+            children = [parse_and()]
+            while peek() == "OR":
+                take("OR")
+                children.append(parse_and())
+            return children[0] if len(children) == 1 else Combination("or", children)
+
+        def parse_and():
+            children = [parse_not()]
+            while peek() == "AND":
+                take("AND")
+                children.append(parse_not())
+            return children[0] if len(children) == 1 else Combination("and", children)
+
+        def parse_not():
+            if peek() == "NOT":
+                take("NOT")
+                return Combination("not", [parse_not()])
+            if peek() == "(":
+                take("(")
+                node = parse_or()
+                take(")")
+                return node
+            return self.parse_term(take("TERM"))
+
+        node = parse_or()
+        if position != len(tokens):
+            raise ValueError(f"Unexpected {tokens[position][1]!r}")
+
+        return node
+
+    def parse_term(self, term: str):
+        label = self.labels.get(normalize(term))
+        if label is not None:
+            return PropertyTerm(label)
+
+        for symbol, op in COMPARISONS.items():
+            col_text, found, value_text = term.partition(symbol)
+            if not found:
+                continue
+            col = self.columns.get(normalize(col_text))
+            if col is None:
+                raise ValueError(f"Unknown column {col_text.strip()!r}")
+            value = self.get_value(col, value_text.strip(), op)
+            if op == "ne":
+                return Combination("not", [Leaf(col, "eq", value)])
+            return Leaf(col, op, value)
+
+        # "Column: value" for values too rare to be a property
+        col_text, found, value_text = term.partition(":")
+        col = self.columns.get(normalize(col_text)) if found else None
+        if col is not None:
+            return Leaf(col, "eq", self.get_value(col, value_text.strip(), "eq"))
+
+        raise ValueError(f"Unknown property or term {term!r}")
+
+    def get_value(self, col: str, text: str, op: str):
+        """
+        Value of col written as text, matched case-insensitively, numbers for comparisons
+        """
+
+        values = self.value_masks[col]
+        if op in ("eq", "ne"):
+            for value in values:
+                if normalize(str(value)) == normalize(text) or (
+                    isinstance(value, float) and text.replace(".", "", 1).isdigit() and float(text) == value
+                ):
+                    return value
+            raise ValueError(f"{col!r} has no value {text!r}")
+
+        # Leaf.test would compare text values to the number and match nothing
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            raise ValueError(f"{col!r} is not numeric, {op} needs a numeric column")
+
+        try:
+            return float(text.rstrip("%"))
+        except ValueError:
+            raise ValueError(f"{col!r} {op} needs a number, got {text!r}") from None
+
+    # Evaluation
+
+    def get_mask(self, query) -> int:
+        """
+        Rank order bitmap of a query: text, condition dict or parsed tree
+        """
+
+        if isinstance(query, str):
+            query = self.parse(query)
+        elif isinstance(query, dict):
+            query = PropertyTerm(query["property"]) if "property" in query else compile_condition(query)
+
+        return self.evaluate(query)
+
+    def evaluate(self, node) -> int:
+        if isinstance(node, PropertyTerm):
+            key = ("property", node.label)
+            mask = self.cache.get(key)
+            if mask is None:
+                mask = self.get_property_mask(node.label)
+                self.store(key, mask)
+            return mask
+
+        if isinstance(node, Combination):
+            masks = [self.evaluate(child) for child in node.children]
+            if node.op == "not":
+                return self.all_mask & ~masks[0]
+            result = masks[0]
+            for mask in masks[1:]:
+                result = result & mask if node.op == "and" else result | mask
+            return result
+
+        key = (node.col, node.op, repr(sorted(node.arg, key=str) if node.op == "in" else node.arg))
+        mask = self.cache.get(key)
+        if mask is None:
+            values = self.value_masks.get(node.col)
+            if values is None:
+                raise ValueError(f"Column {node.col!r} has no value index")
+            if node.op == "quantile":
+                node.prepare(self.dataset.traits, {})
+            mask = 0
+            # Tested once per distinct value, like the property rules
+            for value, value_mask in values.items():
+                if node.test(value):
+                    mask |= value_mask
+            self.store(key, mask)
+
+        return mask
+
+    def get_property_mask(self, label: str) -> int:
+        condition = self.rule_conditions.get(label)
+        if condition is not None:
+            return self.evaluate(condition)
+
+        col, found, value = label.partition(":\n")
+        masks = self.value_masks.get(col, {})
+        for candidate, mask in masks.items():
+            if found and str(candidate) == value:
+                return mask
+
+        raise ValueError(f"Unknown property {label!r}")
+
+    def store(self, key: tuple, mask: int) -> None:
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = mask
+
+    # Results
+
+    def count(self, query) -> int:
+        return self.get_mask(query).bit_count()
+
+    def get_names(self, mask: int, offset: int = 0, limit: int = PAGE_SIZE) -> list:
+        return [self.names[rank] for rank in get_page_ranks(mask, offset, limit)]
+
+    def search(self, query, offset: int = 0, limit: int = PAGE_SIZE) -> dict:
+        """
+        Returns {"count", "offset", "names"}, names in alphabetical order
+        """
+
+        mask = self.get_mask(query)
+
+        return {"count": mask.bit_count(), "offset": offset, "names": self.get_names(mask, offset, limit)}
+
+    def get_intersection_counts(self, row_queries: list, col_queries: list) -> list:
+        """
+        Species count of every row x column pair, eg. to check a hand made grid while curating
+        """
+
+        col_masks = [self.get_mask(query) for query in col_queries]
+
+        return [[(row_mask & col_mask).bit_count() for col_mask in col_masks] for row_mask in map(self.get_mask, row_queries)]
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reverse species query")
+    parser.add_argument("query", help='eg. "Gram Stain: Negative AND Shape: Rod"')
+    parser.add_argument("--offset", type=int, default=0, help="first result")
+    parser.add_argument("--limit", type=int, default=PAGE_SIZE, help="results per page")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    from .data_utils import load_game_dataset
+
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    dataset = load_game_dataset(fast_start=True, keep_frame=False)
+    query = SpeciesQuery(dataset)
+
+    start = time.perf_counter()
+    try:
+        result = query.search(args.query, args.offset, args.limit)
+    except ValueError as error:
+        sys.exit(f"Query error: {error}")
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"{result['count']} species ({elapsed:.3f} ms)")
+    for name in result["names"]:
+        print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Species name search engine without Tk: prefix, genus abbreviation and fuzzy (trigram) matching
+
+Latency benchmark:
+    python -m data.species_search --bench --size 50000
+"""
+
+import argparse
+import heapq
+import random
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+
+def get_ngrams(text: str, size: int = 3) -> set:
+    # Padding lets short names and word boundaries produce grams too
+    padded = f"  {text} "
+
+    return {padded[i : i + size] for i in range(len(padded) - size + 1)}
+
+
+def get_prefix_range(keys: list, prefix: str) -> tuple:
+    """
+    Returns (start, end) of the sorted keys starting with prefix
+    """
+
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + "\uffff", start)
+
+    return (start, end)
+
+
+class SpeciesSearch:
+    """
+    Built once from GameDataset.all_species
+    search(text) combines, in order: full name prefix, genus abbreviation ('S. aureus')
+    and epithet prefix ('aureus'), falling back to typo tolerant fuzzy ranking
+    """
+
+    def __init__(self, names: list, ngram_size: int = 3) -> None:
+        self.names = sorted(set(names), key=str.casefold)
+        self.ngram_size = ngram_size
+
+        # Sorted casefolded full names, same order as names
+        self.keys = [name.casefold() for name in self.names]
+
+        # Sorted 'epithet' and 'g epithet' keys with name index
+        epithets = []
+        abbreviations = []
+        for i, key in enumerate(self.keys):
+            genus, _, epithet = key.partition(" ")
+            epithets.append((epithet, i))
+            abbreviations.append((f"{genus[:1]} {epithet}", i))
+        epithets.sort()
+        abbreviations.sort()
+        self.epithet_keys = [key for key, _ in epithets]
+        self.epithet_ids = [i for _, i in epithets]
+        self.abbreviation_keys = [key for key, _ in abbreviations]
+        self.abbreviation_ids = [i for _, i in abbreviations]
+
+        # Trigram -> name indices
+        self.ngram_index = defaultdict(list)
+        self.ngram_counts = []
+        for i, key in enumerate(self.keys):
+            grams = get_ngrams(key, ngram_size)
+            self.ngram_counts.append(len(grams))
+            for gram in grams:
+                self.ngram_index[gram].append(i)
+
+    def prefix(self, text: str, limit: int = 20) -> list:
+        start, end = get_prefix_range(self.keys, text.casefold())
+
+        return self.names[start : min(end, start + limit)]
+
+    def abbreviation(self, text: str, limit: int = 20) -> list:
+        """
+        Matches 'S. aureus', 'S aur' or 'Staph. aur' (genus prefix, then epithet prefix)
+        """
+
+        genus, separator, epithet = text.casefold().replace(".", " ").partition(" ")
+        epithet = epithet.strip()
+        if not separator or not genus:
+            return []
+
+        if len(genus) == 1:
+            start, end = get_prefix_range(self.abbreviation_keys, f"{genus} {epithet}")
+            return [self.names[i] for i in self.abbreviation_ids[start : min(end, start + limit)]]
+
+        # Longer genus prefix, filter epithet matches by genus
+        start, end = get_prefix_range(self.epithet_keys, epithet)
+        result = []
+        for i in self.epithet_ids[start:end]:
+            if self.keys[i].startswith(genus):
+                result.append(self.names[i])
+                if len(result) == limit:
+                    break
+
+        return result
+
+    def epithet(self, text: str, limit: int = 20) -> list:
+        start, end = get_prefix_range(self.epithet_keys, text.casefold())
+
+        return [self.names[i] for i in self.epithet_ids[start : min(end, start + limit)]]
+
+    def fuzzy(self, text: str, limit: int = 20, min_score: float = 0.3) -> list:
+        """
+        Ranks names by trigram Jaccard similarity to the query
+        Very common grams are skipped when rarer ones exist, they barely change the ranking
+        """
+
+        grams = get_ngrams(text.casefold(), self.ngram_size)
+        postings = sorted(
+            (self.ngram_index[gram] for gram in grams if gram in self.ngram_index), key=len
+        )
+        if not postings:
+            return []
+
+        common_limit = max(1000, len(self.names) // 4)
+        rare_postings = [posting for posting in postings if len(posting) <= common_limit]
+        postings = rare_postings or postings[:1]
+
+        shared = defaultdict(int)
+        for posting in postings:
+            for i in posting:
+                shared[i] += 1
+
+        query_count = len(grams)
+        ngram_counts = self.ngram_counts
+        scored = (
+            (count / (query_count + ngram_counts[i] - count), i) for i, count in shared.items()
+        )
+        best = heapq.nlargest(limit, scored)
+
+        return [self.names[i] for score, i in best if score >= min_score]
+
+    def search(self, text: str, limit: int = 20) -> list:
+        """
+        Returns up to limit names, prefix style matches first, fuzzy matches only if there are none
+        """
+
+        text = text.strip()
+        if not text:
+            return self.names[:limit]
+
+        result = []
+        seen = set()
+        for method in (self.prefix, self.abbreviation, self.epithet):
+            for name in method(text, limit):
+                if name not in seen:
+                    seen.add(name)
+                    result.append(name)
+            if len(result) >= limit:
+                break
+
+        # Typo tolerance only when nothing matches exactly
+        if not result:
+            result = self.fuzzy(text, limit)
+
+        return result[:limit]
+
+    def resolve(self, text: str) -> str | None:
+        """
+        Exact name if typed in full, otherwise the best match
+        """
+
+        text = text.strip()
+        start, end = get_prefix_range(self.keys, text.casefold())
+        if start < end and self.keys[start] == text.casefold():
+            return self.names[start]
+
+        matches = self.search(text, 1) if text else []
+
+        return matches[0] if matches else None
+
+
+def run_benchmark(size: int, queries: int) -> None:
+    # Same generator as the benchmark suite, imported here so the search itself needs nothing else
+    from .synthetic_dataset import get_synthetic_names
+
+    names = get_synthetic_names(size)
+    start = time.perf_counter()
+    engine = SpeciesSearch(names)
+    print(f"{size} names, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    samples = rng.sample(names, queries)
+    cases = {
+        "prefix": [name[: rng.randint(1, 8)] for name in samples],
+        "abbreviation": [f"{name[0]}. {name.split(' ')[1][:4]}" for name in samples],
+        # One dropped character
+        "fuzzy": [name[:3] + name[4:] for name in samples],
+    }
+
+    for case, texts in cases.items():
+        timings = []
+        for text in texts:
+            start = time.perf_counter()
+            engine.search(text)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"  {case:<14} mean {mean:6.2f} ms  p95 {p95:6.2f} ms  max {timings[-1]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Species search latency benchmark")
+    parser.add_argument("--bench", action="store_true", help="run the benchmark")
+    parser.add_argument("--size", type=int, default=50000, help="synthetic name count")
+    parser.add_argument("--queries", type=int, default=500, help="queries per case")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.size, args.queries)
+    else:
+        parser.print_help()
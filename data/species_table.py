@@ -0,0 +1,130 @@
+from __future__ import annotations
+import sys
+from array import array
+from typing import TYPE_CHECKING
+from instrumentation import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def get_typecode(size: int) -> str:
+    """
+    Smallest unsigned array typecode holding codes 0..size-1
+    """
+
+    if size <= 0xFF + 1:
+        return "B"
+    if size <= 0xFFFF + 1:
+        return "H"
+
+    return "I"
+
+
+def intern_value(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class SpeciesTable:
+    """
+    Trait values stored column-wise: per column a table of distinct values and one code per species ID
+    Code 0 is a missing value, every distinct value is kept once however many species share it
+    """
+
+    def __init__(self, columns: list, values: list, codes: list) -> None:
+        self.columns = list(columns)
+        # values[c][code] is the value, values[c][0] is None
+        self.values = values
+        # codes[c][species_id] indexes values[c]
+        self.codes = codes
+        # value -> code per column, only built for updates
+        self.lookup = None
+
+    def __len__(self) -> int:
+        return len(self.codes[0]) if self.codes else 0
+
+    @classmethod
+    @timed("dataset.factorize")
+    def from_frame(cls, df: pd.DataFrame) -> SpeciesTable:
+        """
+        Factorizes every column with pandas, values become plain Python objects
+        """
+
+        import numpy as np
+        import pandas as pd
+
+        values = []
+        codes = []
+        for col in df.columns:
+            column_codes, uniques = pd.factorize(df[col])
+            table = [None] + [intern_value(value) for value in uniques.tolist()]
+            # Missing values are -1, shifted to code 0
+            typecode = get_typecode(len(table))
+            column_codes = (column_codes + 1).astype(np.dtype(typecode))
+            values.append(table)
+            codes.append(array(typecode, column_codes.tobytes()))
+
+        return cls(df.columns, values, codes)
+
+    def get_record(self, species_id: int) -> tuple:
+        return tuple(
+            values[codes[species_id]] for values, codes in zip(self.values, self.codes)
+        )
+
+    def get_code(self, index: int, value) -> int:
+        """
+        Returns the code of a value in column index, new values are added to the value table
+        """
+
+        if value is None:
+            return 0
+
+        if self.lookup is None:
+            self.lookup = [
+                {value: code for code, value in enumerate(values) if code} for values in self.values
+            ]
+
+        code = self.lookup[index].get(value)
+        if code is None:
+            values = self.values[index]
+            code = self.lookup[index][value] = len(values)
+            values.append(intern_value(value))
+            # Widen the code array when the value table outgrows its typecode
+            typecode = get_typecode(len(values))
+            if typecode != self.codes[index].typecode:
+                self.codes[index] = array(typecode, self.codes[index])
+
+        return code
+
+    def append(self, record: tuple) -> None:
+        for index, value in enumerate(record):
+            self.codes[index].append(self.get_code(index, value))
+
+    def set_record(self, species_id: int, record: tuple) -> None:
+        for index, value in enumerate(record):
+            self.codes[index][species_id] = self.get_code(index, value)
+
+    def remove(self, species_ids: list) -> None:
+        # Unused values stay in the table, codes of other species don't change
+        removed = set(species_ids)
+        for codes in self.codes:
+            # One filtered pass per column, a del per species would shift the rest every time
+            kept = (code for species_id, code in enumerate(codes) if species_id not in removed)
+            codes[:] = array(codes.typecode, kept)
+
+    def to_compact(self) -> list:
+        """
+        JSON serializable [values, codes] per column
+        """
+
+        return [[values, codes.tolist()] for values, codes in zip(self.values, self.codes)]
+
+    @classmethod
+    def from_compact(cls, columns: list, compact: list) -> SpeciesTable:
+        values = []
+        codes = []
+        for table, column_codes in compact:
+            values.append([intern_value(value) for value in table])
+            codes.append(array(get_typecode(len(table)), column_codes))
+
+        return cls(columns, values, codes)
@@ -0,0 +1,136 @@
+"""
+Synthetic datasets shaped like microbes.xlsx, for benchmarks and memory reports at 1k to 1M rows
+
+    python -m data.synthetic_dataset --rows 100000 -o synthetic.csv
+
+Rows resample the real sheet, so trait values, their frequencies and the correlations between traits
+stay realistic. Names are generated: about GENUS_SIZE species per genus with a skewed genus size,
+every full name unique. Every genus belongs to one family, families grow with the square root of the genus count
+(FAMILY_GROWTH, like new families get rarer as more genera are described), the sheet's families first.
+Categorical traits keep the sheet's values. GC Content gets a small jitter (whole percentages, like the sheet).
+Output format is picked by suffix: .csv, .parquet, .arrow / .feather (pyarrow) or .xlsx.
+"""
+
+import argparse
+import random
+import sys
+from itertools import accumulate
+from .data_utils import get_dataset
+
+SYLLABLES = ["ba", "ci", "lo", "stre", "pto", "co", "ccus", "my", "cob", "act", "er", "ium", "vi", "bri", "ps", "eu", "do", "mo", "nas", "sal"]
+GENUS_SIZE = 15
+# Families per square root of the genus count, about 500 at 1M rows
+FAMILY_GROWTH = 2
+GC_JITTER = 1.5
+
+
+def get_word(rng: random.Random) -> str:
+    return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+
+
+def get_synthetic_names(size: int, seed: int = 0) -> list:
+    """
+    Returns size unique 'Genus epithet' names, genus sizes follow a 1/rank distribution
+    """
+
+    rng = random.Random(seed)
+    genera = set()
+    genus_count = max(1, size // GENUS_SIZE)
+    while len(genera) < genus_count:
+        genera.add(get_word(rng).capitalize())
+    genera = sorted(genera)
+    rng.shuffle(genera)
+
+    weights = list(accumulate(1 / rank for rank in range(1, genus_count + 1)))
+    names = []
+    seen = set()
+    for genus in rng.choices(genera, cum_weights=weights, k=size):
+        name = f"{genus} {get_word(rng)}"
+        while name in seen:
+            name = f"{genus} {get_word(rng)}{rng.choice(SYLLABLES)}"
+        seen.add(name)
+        names.append(name)
+
+    return names
+
+
+def get_synthetic_families(genera: list, sheet_families: list, seed: int = 0) -> dict:
+    """
+    Returns {genus: family}, at least the sheet's families, more as the genus count grows (see FAMILY_GROWTH)
+    """
+
+    rng = random.Random(seed)
+    families = list(dict.fromkeys(sheet_families))
+    seen = set(families)
+    while len(families) < round(FAMILY_GROWTH * len(genera) ** 0.5):
+        family = f"{get_word(rng).capitalize()}aceae"
+        if family not in seen:
+            seen.add(family)
+            families.append(family)
+
+    # Round robin over shuffled genera, genus sizes are skewed so family sizes are too
+    genera = list(genera)
+    rng.shuffle(genera)
+
+    return {genus: families[index % len(families)] for index, genus in enumerate(genera)}
+
+
+def get_synthetic_frame(size: int, seed: int = 0):
+    import numpy as np
+
+    sheet = get_dataset()
+    df = sheet.sample(size, replace=True, random_state=seed).reset_index(drop=True)
+    names = get_synthetic_names(size, seed)
+    df["Genus"] = [name.split(" ", 1)[0] for name in names]
+    df["Species"] = [name.split(" ", 1)[1] for name in names]
+
+    if "Family" in df.columns:
+        families = get_synthetic_families(
+            sorted(df["Genus"].unique()), sheet["Family"].dropna().unique().tolist(), seed
+        )
+        df["Family"] = df["Genus"].map(families)
+
+    if "GC Content" in df.columns:
+        gc = df["GC Content"].astype("float64")
+        jitter = np.random.default_rng(seed).uniform(-GC_JITTER, GC_JITTER, size)
+        df["GC Content"] = (gc + jitter).clip(0, 100).round().astype("Int64")
+
+    return df
+
+
+def write_frame(df, path: str) -> None:
+    suffix = path.rsplit(".", 1)[-1].lower()
+    if suffix == "csv":
+        df.to_csv(path, index=False)
+    elif suffix == "parquet":
+        df.to_parquet(path, index=False)
+    elif suffix in ("arrow", "feather", "ipc"):
+        df.to_feather(path)
+    elif suffix == "xlsx":
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format {suffix!r}")
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Synthetic microbes dataset")
+    parser.add_argument("--rows", type=int, required=True, help="species count")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-o", "--output", required=True, help=".csv, .parquet, .arrow/.feather or .xlsx file")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    df = get_synthetic_frame(args.rows, args.seed)
+    write_frame(df, args.output)
+    print(
+        f"{len(df)} species, {df['Genus'].nunique()} genera, {df['Family'].nunique()} families "
+        f"written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Answer statistics: how often each species was given for a row/column property pair, and how rare an answer is
+
+    python -m engine.answer_stats --info
+    python -m engine.answer_stats --bench 2000000 --path /tmp/answer-bench.sqlite3
+
+Correct answers are counted per (property pair, species) in SQLite, keyed by property labels so counts
+survive rule and dataset changes. The pair is unordered, a transposed grid shares its counts.
+Writes are queued and committed in batches by one worker thread, the caller never waits for the disk.
+Cells in use are held in memory (LRU) and updated at once by record(), so rarity is read without a query.
+
+Rarity of an answer:
+    share       part of the cell's answers that named the same species (Geo Grid style "3% picked this")
+    percentile  part of the cell's answers naming a more popular species, 100 is the rarest pick
+"""
+
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from data.dataset_cache import get_cache_dir
+
+STATS_NAME = "answer-stats.sqlite3"
+FLUSH_INTERVAL = 0.5
+BATCH_SIZE = 1000
+CACHE_SIZE = 4096
+# Longest wait for the counts of a cell that wasn't preloaded
+LOAD_TIMEOUT = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answer_counts (
+    prop_a TEXT NOT NULL,
+    prop_b TEXT NOT NULL,
+    species TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (prop_a, prop_b, species)
+) WITHOUT ROWID
+"""
+UPSERT = """
+INSERT INTO answer_counts VALUES (?, ?, ?, ?)
+ON CONFLICT (prop_a, prop_b, species) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def get_stats_file() -> str:
+    """
+    MICROBES_GRID_ANSWER_STATS overrides the default file in the user cache
+    """
+
+    return os.environ.get("MICROBES_GRID_ANSWER_STATS") or os.path.join(get_cache_dir(), STATS_NAME)
+
+
+def get_cell_key(row_label: str, col_label: str) -> tuple:
+    return (row_label, col_label) if row_label <= col_label else (col_label, row_label)
+
+
+class CellStats:
+    """
+    Species counts of one property pair
+    Answers per count value are kept too, so a percentile costs one pass over distinct counts
+    """
+
+    def __init__(self) -> None:
+        self.counts = {}
+        self.total = 0
+        # count -> answers given for species that have exactly this count
+        self.answers_by_count = Counter()
+        # Set once the stored counts are merged in
+        self.loaded = threading.Event()
+
+    def add(self, species: str, amount: int = 1) -> None:
+        old = self.counts.get(species, 0)
+        new = old + amount
+        self.counts[species] = new
+        self.total += amount
+        if old:
+            self.answers_by_count[old] -= old
+            if not self.answers_by_count[old]:
+                del self.answers_by_count[old]
+        self.answers_by_count[new] += new
+
+    def get_rarity(self, species: str) -> dict:
+        count = self.counts.get(species, 0)
+        if not self.total:
+            return {"count": 0, "total": 0, "share": 0.0, "percentile": 100.0}
+
+        more_popular = sum(answers for value, answers in self.answers_by_count.items() if value > count)
+
+        return {
+            "count": count,
+            "total": self.total,
+            "share": count / self.total,
+            "percentile": 100 * more_popular / self.total,
+        }
+
+
+class AnswerStats:
+    """
+    start() opens the store and the writer thread, close() commits what is queued
+    record() and get_rarity() are safe to call from the UI thread and never touch the disk,
+    they only wait for a cell that wasn't preloaded
+    If the store can't be opened or written, stats are disabled and both return None
+    """
+
+    def __init__(
+        self, path: str | None = None, flush_interval: float = FLUSH_INTERVAL,
+        batch_size: int = BATCH_SIZE, cache_size: int = CACHE_SIZE,
+    ) -> None:
+        self.path = path or get_stats_file()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        # key -> CellStats, most recently used last
+        self.cells = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="AnswerStats", daemon=True)
+        self.written = 0
+        # Set by the writer when the store fails, nothing is recorded afterwards
+        self.disabled = False
+
+    def connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        # WAL lets readers (eg. --info) work while the game writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+
+        return connection
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def close(self) -> None:
+        """
+        Commits every queued answer and stops the writer
+        """
+
+        if self.thread.is_alive():
+            self.queue.put(("stop",))
+            self.thread.join()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until everything recorded so far is committed
+        """
+
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        if self.disabled:
+            return False
+
+        return done.wait(timeout)
+
+    def disable(self, error: Exception) -> None:
+        """
+        Stops recording after a store error, releases everything waiting for the writer
+        """
+
+        print(f"Answer statistics disabled: {error}", file=sys.stderr)
+        with self.lock:
+            self.disabled = True
+            for cell in self.cells.values():
+                cell.loaded.set()
+
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "flush":
+                item[1].set()
+
+    # Writer thread
+
+    def run(self) -> None:
+        try:
+            connection = self.connect()
+        except (sqlite3.Error, OSError) as error:
+            self.disable(error)
+            return
+
+        pending = Counter()
+        first_pending = 0.0
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item[0] == "answer":
+                    if not pending:
+                        first_pending = time.monotonic()
+                    pending[item[1]] += 1
+                    if len(pending) < self.batch_size and time.monotonic() - first_pending < self.flush_interval:
+                        continue
+
+                # Everything queued before a load or flush is committed first
+                self.write(connection, pending)
+
+                if item is None or item[0] == "answer":
+                    continue
+                if item[0] == "load":
+                    self.load(connection, item[1], item[2])
+                elif item[0] == "flush":
+                    item[1].set()
+                elif item[0] == "stop":
+                    break
+        except (sqlite3.Error, OSError) as error:
+            self.disable(error)
+        finally:
+            connection.close()
+
+    def write(self, connection: sqlite3.Connection, pending: Counter) -> None:
+        if not pending:
+            return
+
+        with connection:
+            connection.executemany(UPSERT, [(*key, species, amount) for (key, species), amount in pending.items()])
+        self.written += sum(pending.values())
+        pending.clear()
+
+    def load(self, connection: sqlite3.Connection, key: tuple, cell: CellStats) -> None:
+        rows = connection.execute(
+            "SELECT species, count FROM answer_counts WHERE prop_a = ? AND prop_b = ?", key
+        ).fetchall()
+        # Answers recorded since the cell was created are still queued behind this load, so they add up
+        with self.lock:
+            for species, count in rows:
+                cell.add(species, count)
+        cell.loaded.set()
+
+    # Caller side
+
+    def get_cell(self, key: tuple) -> CellStats | None:
+        with self.lock:
+            if self.disabled:
+                return None
+
+            cell = self.cells.get(key)
+            if cell is not None:
+                self.cells.move_to_end(key)
+                return cell
+
+            cell = self.cells[key] = CellStats()
+            if len(self.cells) > self.cache_size:
+                self.cells.popitem(last=False)
+        self.queue.put(("load", key, cell))
+
+        return cell
+
+    def preload(self, pairs) -> None:
+        """
+        Starts loading the counts of (row label, col label) pairs, eg. every cell of a new board
+        """
+
+        if self.disabled:
+            return
+
+        for row_label, col_label in pairs:
+            self.get_cell(get_cell_key(row_label, col_label))
+
+    def record(self, row_label: str, col_label: str, species: str) -> dict | None:
+        """
+        Counts a correct answer, returns its rarity including this answer (None while disabled)
+        """
+
+        key = get_cell_key(row_label, col_label)
+        cell = self.get_cell(key)
+        if cell is None:
+            return None
+        # Only waits when the cell wasn't preloaded
+        cell.loaded.wait(LOAD_TIMEOUT)
+        if self.disabled:
+            return None
+        with self.lock:
+            cell.add(species)
+            rarity = cell.get_rarity(species)
+        self.queue.put(("answer", (key, species)))
+
+        return rarity
+
+    def get_rarity(self, row_label: str, col_label: str, species: str) -> dict | None:
+        cell = self.get_cell(get_cell_key(row_label, col_label))
+        if cell is None:
+            return None
+        cell.loaded.wait(LOAD_TIMEOUT)
+        if self.disabled:
+            return None
+        with self.lock:
+            return cell.get_rarity(species)
+
+
+def print_info(path: str) -> None:
+    connection = sqlite3.connect(path)
+    total, species, cells = connection.execute(
+        "SELECT COALESCE(SUM(count), 0), COUNT(*), COUNT(DISTINCT prop_a || char(0) || prop_b) FROM answer_counts"
+    ).fetchone()
+    print(f"{path}: {total} answers, {species} (pair, species) counts, {cells} property pairs")
+    connection.close()
+
+
+def run_benchmark(path: str, answers: int) -> None:
+    """
+    Records answers over a few hundred cells, then times rarity reads after reloading the cells
+    """
+
+    rng = random.Random(0)
+    labels = [f"Property {i}" for i in range(40)]
+    names = [f"Species {i}" for i in range(300)]
+    # Skewed picks, a few species are the obvious answer of a cell
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+
+    stats = AnswerStats(path)
+    stats.start()
+    start = time.perf_counter()
+    record_timings = []
+    for picked in rng.choices(names, weights, k=answers):
+        row, col = rng.sample(labels, 2)
+        began = time.perf_counter()
+        stats.record(row, col, picked)
+        record_timings.append(time.perf_counter() - began)
+    stats.flush()
+    elapsed = time.perf_counter() - start
+    stats.close()
+    record_timings.sort()
+    print(
+        f"{answers} answers recorded and committed in {elapsed:.1f} s, "
+        f"record() p50 {record_timings[len(record_timings) // 2] * 1e6:.1f} us, "
+        f"p99 {record_timings[int(len(record_timings) * 0.99)] * 1e6:.1f} us"
+    )
+
+    # Fresh process state: cells come from disk
+    stats = AnswerStats(path)
+    stats.start()
+    pairs = [tuple(rng.sample(labels, 2)) for _ in range(9)]
+    began = time.perf_counter()
+    stats.preload(pairs)
+    stats.flush()
+    print(f"9 cells loaded in {(time.perf_counter() - began) * 1000:.1f} ms")
+    began = time.perf_counter()
+    for row, col in pairs:
+        stats.record(row, col, rng.choice(names))
+    print(f"9 record + rarity reads in {(time.perf_counter() - began) * 1e6:.0f} us")
+    stats.close()
+    print_info(path)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Answer statistics store")
+    parser.add_argument("--path", help=f"store file (default {get_stats_file()})")
+    parser.add_argument("--info", action="store_true", help="print answer and pair counts")
+    parser.add_argument("--bench", type=int, metavar="ANSWERS", help="record synthetic answers into --path and time it")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.bench:
+        if not args.path:
+            sys.exit("--bench needs --path, it writes synthetic answers")
+        run_benchmark(args.path, args.bench)
+    elif args.info:
+        print_info(args.path or get_stats_file())
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from data.species_index import SpeciesIndex
+from engine.matching import hopcroft_karp
+
+
+class BoardSolver:
+    """
+    Keeps one complete assignment of open cells to distinct unused species (a perfect matching)
+    Accepting an answer repairs the assignment with a single augmenting path instead of re-solving
+    A board is dead when some open cell can no longer get a species, filling more cells never revives it
+    """
+
+    def __init__(self, intersections: list) -> None:
+        # Candidate species mask per open cell
+        self.cell_masks = {
+            (row, col): mask
+            for row, masks in enumerate(intersections)
+            for col, mask in enumerate(masks)
+        }
+        self.used = 0
+        self.assignment = {}
+        self.owner = {}
+
+        cells = list(self.cell_masks)
+        adjacency = [SpeciesIndex.ids_from_mask(self.cell_masks[cell]) for cell in cells]
+        for index, species_id in hopcroft_karp(adjacency).items():
+            self.assignment[cells[index]] = species_id
+            self.owner[species_id] = cells[index]
+
+        self.dead = len(self.assignment) < len(cells)
+
+    def get_options(self, cell: tuple) -> int:
+        """
+        Returns the mask of unused candidate species of an open cell
+        """
+
+        return self.cell_masks[cell] & ~self.used
+
+    def augment(self, cell: tuple, visited: set) -> bool:
+        """
+        Finds a species for cell, moving other cells along an alternating path if needed
+        """
+
+        for species_id in SpeciesIndex.ids_from_mask(self.get_options(cell)):
+            if species_id in visited:
+                continue
+            visited.add(species_id)
+
+            owner = self.owner.get(species_id)
+            if owner is None or self.augment(owner, visited):
+                self.assignment[cell] = species_id
+                self.owner[species_id] = cell
+                return True
+
+        return False
+
+    def fill(self, row: int, col: int, species_id: int) -> None:
+        """
+        Removes the answered cell and the used species, repairs the assignment
+        """
+
+        cell = (row, col)
+        del self.cell_masks[cell]
+        self.used |= 1 << species_id
+
+        previous = self.assignment.pop(cell, None)
+        if previous is not None:
+            del self.owner[previous]
+
+        # The species was planned for another cell, that cell needs a new one
+        displaced = self.owner.pop(species_id, None)
+        if displaced is not None:
+            del self.assignment[displaced]
+            if not self.augment(displaced, {species_id}):
+                self.dead = True
+
+    def is_dead(self) -> bool:
+        return self.dead
+
+    def is_feasible(self, cell: tuple, species_id: int) -> bool:
+        """
+        True if the board can still be completed with species_id in cell
+        """
+
+        if self.dead or not self.get_options(cell) >> species_id & 1:
+            return False
+
+        owner = self.owner.get(species_id)
+        if owner == cell:
+            return True
+
+        # Try on a copy, the live assignment must stay intact
+        trial = BoardSolver.__new__(BoardSolver)
+        trial.cell_masks = dict(self.cell_masks)
+        trial.used = self.used
+        trial.assignment = dict(self.assignment)
+        trial.owner = dict(self.owner)
+        trial.dead = False
+        trial.fill(cell[0], cell[1], species_id)
+
+        return not trial.dead
+
+    def count_completions(self, limit: int = 10000, max_dp_cells: int = 12) -> int:
+        """
+        Counts ways to fill the open cells with distinct species, capped at limit
+        Small boards are counted exactly by DP over species and filled-cell subsets,
+        bigger ones by backtracking that stops at limit
+        """
+
+        if self.dead:
+            return 0
+
+        cells = list(self.cell_masks)
+        options = [self.get_options(cell) for cell in cells]
+
+        if len(cells) <= max_dp_cells:
+            return min(self.count_by_species(options), limit)
+
+        # Most constrained cells first keeps the search small
+        options.sort(key=int.bit_count)
+
+        def count(index: int, used: int) -> int:
+            if index == len(options):
+                return 1
+
+            total = 0
+            free = options[index] & ~used
+            while free and total < limit:
+                lowest = free & -free
+                free ^= lowest
+                total += count(index + 1, used | lowest)
+
+            return total
+
+        return min(count(0, 0), limit)
+
+    @staticmethod
+    def count_by_species(options: list) -> int:
+        """
+        Number of perfect matchings: each species fills at most one cell
+        State is the bitmask of filled cells, reached in a number of ways
+        """
+
+        union = 0
+        for mask in options:
+            union |= mask
+
+        ways = {0: 1}
+        for species_id in SpeciesIndex.ids_from_mask(union):
+            bit = 1 << species_id
+            cell_bits = [1 << i for i, mask in enumerate(options) if mask & bit]
+
+            next_ways = dict(ways)
+            for state, count in ways.items():
+                for cell_bit in cell_bits:
+                    if not state & cell_bit:
+                        next_state = state | cell_bit
+                        next_ways[next_state] = next_ways.get(next_state, 0) + count
+            ways = next_ways
+
+        return ways.get((1 << len(options)) - 1, 0)
+
+    def hint(self, cell: tuple, popularity: list) -> int | None:
+        """
+        Returns the rarest species that fits cell and keeps the board solvable
+        Rarest: fits the fewest open cells, then belongs to the fewest properties (popularity per species ID)
+        """
+
+        if self.dead or cell not in self.cell_masks:
+            return None
+
+        open_masks = [self.get_options(other) for other in self.cell_masks]
+
+        def rarity(species_id: int) -> tuple:
+            bit = 1 << species_id
+            fits = sum(1 for mask in open_masks if mask & bit)
+            return (fits, popularity[species_id], species_id)
+
+        candidates = sorted(SpeciesIndex.ids_from_mask(self.get_options(cell)), key=rarity)
+        for species_id in candidates:
+            if self.is_feasible(cell, species_id):
+                return species_id
+
+        return None
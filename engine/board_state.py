@@ -0,0 +1,37 @@
+class BoardState:
+    """
+    Constant time board bookkeeping, never touches widgets
+    Holds the accepted answer per cell, the set of used names, the filled cell counter
+    and a map of cell handles (eg. tk.Button) to (row, col)
+    """
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.answers = [[None] * cols for _ in range(rows)]
+        self.used = set()
+        self.filled = 0
+        self.positions = {}
+
+    def register_cell(self, cell, row: int, col: int) -> None:
+        self.positions[cell] = (row, col)
+
+    def get_position(self, cell) -> tuple:
+        return self.positions[cell]
+
+    def is_used(self, name: str) -> bool:
+        return name in self.used
+
+    def is_filled(self, row: int, col: int) -> bool:
+        return self.answers[row][col] is not None
+
+    def fill(self, row: int, col: int, name: str) -> None:
+        if self.answers[row][col] is not None:
+            raise ValueError(f"Cell ({row}, {col}) is already filled")
+
+        self.answers[row][col] = name
+        self.used.add(name)
+        self.filled += 1
+
+    def is_complete(self) -> bool:
+        return self.filled == self.rows * self.cols
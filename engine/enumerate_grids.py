@@ -0,0 +1,244 @@
+"""
+Enumerates every valid N x N grid into a catalogue directory
+
+    python -m engine.enumerate_grids --size 3 -o catalogue --workers 8
+
+Grids are stored once per equivalence class: row order, column order and transpose don't matter.
+Work is split by the first column property. Every finished task is written as its own part file,
+so an interrupted run resumes where it stopped when started again with the same arguments.
+
+Catalogue layout:
+    manifest.json   size, record format, dataset fingerprint, property labels, index per first column
+    grids.bin       fixed size little endian records (see RECORD_FORMAT)
+    parts/          per task results, removed after merge
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Callable
+from data.compatibility_graph import CompatibilityGraph
+from data.data_utils import load_game_dataset
+from data.dataset_cache import write_atomic
+from engine.matching import is_solvable
+
+CATALOGUE_VERSION = 2
+
+
+def get_record_struct(size: int) -> struct.Struct:
+    """
+    Record: column property ids, row property ids (uint16 each, ascending),
+    minimum cell intersection (uint32), total valid answers over all cells (uint32)
+    """
+
+    return struct.Struct(f"<{2 * size}HII")
+
+
+# Per worker process state, built once by init_worker
+_MASKS = None
+_COUNTS = None
+_ADJACENCY = None
+_SIZE = 3
+
+
+def init_worker(properties: list, size: int, min_common: int) -> None:
+    global _MASKS, _COUNTS, _ADJACENCY, _SIZE
+    graph = CompatibilityGraph(properties, min_common, count_grids=False)
+    _MASKS = [prop[1] for prop in properties]
+    # Cell sizes come straight from the intersection count matrix
+    _COUNTS = graph.counts
+    _ADJACENCY = graph.adjacency
+    _SIZE = size
+
+
+def enumerate_first_col(first: int, part_path: str) -> tuple:
+    """
+    Writes every canonical grid whose smallest column property is first
+    Canonical: columns and rows ascending, smallest column < smallest row (kills the transpose)
+    Returns (first, grid count)
+    """
+
+    masks = _MASKS
+    size = _SIZE
+    cells = size * size
+    record = get_record_struct(size)
+    property_count = len(masks)
+    # Rows must come after the first column to stay canonical
+    after_first = ~((1 << (first + 1)) - 1)
+
+    output = bytearray()
+    count = 0
+
+    for rest in combinations(range(first + 1, property_count), size - 1):
+        col_ids = (first,) + rest
+
+        candidates = after_first
+        for col_id in col_ids:
+            candidates &= _ADJACENCY[col_id]
+        if candidates.bit_count() < size:
+            continue
+
+        candidate_ids = [i for i in range(first + 1, property_count) if candidates >> i & 1]
+        col_masks = [masks[col_id] for col_id in col_ids]
+
+        for row_ids in combinations(candidate_ids, size):
+            sizes = [_COUNTS[row_id][col_id] for row_id in row_ids for col_id in col_ids]
+            min_intersection = min(sizes)
+
+            # Every cell with at least as many options as cells can always be filled greedily
+            if min_intersection < cells:
+                cell_masks = [masks[row_id] & col_mask for row_id in row_ids for col_mask in col_masks]
+                if not is_solvable(cell_masks):
+                    continue
+
+            output += record.pack(*col_ids, *row_ids, min_intersection, sum(sizes))
+            count += 1
+
+    write_atomic(part_path, bytes(output))
+
+    return (first, count)
+
+
+def read_manifest(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_parts(output_dir: str, manifest: dict) -> None:
+    """
+    Concatenates part files in first column order and builds the index
+    """
+
+    parts_dir = os.path.join(output_dir, "parts")
+    index = {}
+    start = 0
+    grids_tmp = os.path.join(output_dir, "grids.bin.tmp")
+
+    with open(grids_tmp, "wb") as grids:
+        for first in range(len(manifest["properties"])):
+            part_path = os.path.join(parts_dir, f"{first:05d}.bin")
+            with open(part_path, "rb") as part:
+                data = part.read()
+            count = len(data) // manifest["record_size"]
+            if count:
+                index[str(first)] = [start, count]
+            start += count
+            grids.write(data)
+
+    os.replace(grids_tmp, os.path.join(output_dir, "grids.bin"))
+
+    manifest["index"] = index
+    manifest["count"] = start
+    manifest["complete"] = True
+    write_atomic(
+        os.path.join(output_dir, "manifest.json"), json.dumps(manifest, indent=1).encode("utf-8")
+    )
+
+    for first in range(len(manifest["properties"])):
+        os.remove(os.path.join(parts_dir, f"{first:05d}.bin"))
+    os.rmdir(parts_dir)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Enumerate all valid grids")
+    parser.add_argument("-o", "--output", required=True, help="catalogue directory")
+    parser.add_argument("--size", type=int, default=3, help="grid size N for N x N")
+    parser.add_argument("--min-common", type=int, default=3, help="species per cell at least")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="process count")
+    parser.add_argument("--fast-start", action="store_true", help="load the compact artifact")
+
+    return parser.parse_args(argv)
+
+
+def build_catalogue(
+    output: str, properties: list, fingerprint: str, size: int = 3, min_common: int = 3,
+    workers: int | None = None, report: Callable = print,
+) -> int:
+    """
+    Enumerates into output, resuming an interrupted run with the same settings
+    report gets the progress lines, returns the grid count
+    """
+
+    if len(properties) > 0xFFFF:
+        raise ValueError("Too many properties for uint16 property ids")
+
+    manifest_path = os.path.join(output, "manifest.json")
+    parts_dir = os.path.join(output, "parts")
+    record = get_record_struct(size)
+
+    manifest = {
+        "version": CATALOGUE_VERSION,
+        "size": size,
+        "min_common": min_common,
+        "record_format": record.format,
+        "record_size": record.size,
+        "fingerprint": fingerprint,
+        "properties": [prop[0] for prop in properties],
+    }
+
+    existing = read_manifest(manifest_path)
+    if existing is not None:
+        settings = ("version", "size", "min_common", "fingerprint")
+        if any(existing.get(key) != manifest[key] for key in settings):
+            raise ValueError(f"{output} holds a catalogue for other settings or data")
+        if existing.get("complete"):
+            report(f"Catalogue already complete: {existing['count']} grids")
+            return existing["count"]
+
+    os.makedirs(parts_dir, exist_ok=True)
+    write_atomic(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    # Resume: finished tasks already have their part file
+    pending = [
+        first for first in range(len(properties))
+        if not os.path.exists(os.path.join(parts_dir, f"{first:05d}.bin"))
+    ]
+    done = len(properties) - len(pending)
+    report(f"{done} of {len(properties)} tasks already done")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(properties, size, min_common),
+    ) as executor:
+        futures = [
+            executor.submit(
+                enumerate_first_col, first, os.path.join(parts_dir, f"{first:05d}.bin")
+            )
+            for first in pending
+        ]
+        try:
+            for future in as_completed(futures):
+                first, count = future.result()
+                done += 1
+                report(f"[{done}/{len(properties)}] column {first}: {count} grids")
+        except BaseException:
+            # Interrupted (eg. Ctrl+C), queued tasks are dropped, written parts are kept for the resume
+            executor.shutdown(cancel_futures=True)
+            raise
+
+    merge_parts(output, manifest)
+    report(f"Catalogue complete: {manifest['count']} grids")
+
+    return manifest["count"]
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    dataset = load_game_dataset(args.fast_start)
+    build_catalogue(
+        args.output, dataset.properties, dataset.get_fingerprint(), args.size, args.min_common, args.workers,
+        lambda line: print(line, flush=True),
+    )
+
+
+if __name__ == "__main__":
+    main()
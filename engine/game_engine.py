@@ -0,0 +1,281 @@
+import random
+from data.compatibility_graph import CompatibilityGraph
+from data.game_dataset import GameDataset
+from data.species_query import SpeciesQuery
+from engine.board_solver import BoardSolver
+from engine.board_state import BoardState
+from engine.grid_generator import GridGenerator
+from instrumentation import count, timed, timed_block
+
+
+class Puzzle:
+    """
+    One generated grid: column and row property indices into GameDataset.properties
+    Intersections are species bitmasks, intersections[row][col]
+    """
+
+    def __init__(self, seed: int, col_ids: list, row_ids: list, dataset: GameDataset) -> None:
+        self.seed = seed
+        self.col_ids = list(col_ids)
+        self.row_ids = list(row_ids)
+        self.cols = [dataset.properties[i] for i in self.col_ids]
+        self.rows = [dataset.properties[i] for i in self.row_ids]
+        self.intersections = [[row[1] & col[1] for col in self.cols] for row in self.rows]
+
+    def to_dict(self, dataset: GameDataset, answers: bool = False) -> dict:
+        """
+        JSON serializable form, labels are included for readability and validation
+        answers=True adds the valid names per cell
+        """
+
+        result = {
+            "seed": self.seed,
+            "cols": [{"id": i, "label": col[0]} for i, col in zip(self.col_ids, self.cols)],
+            "rows": [{"id": i, "label": row[0]} for i, row in zip(self.row_ids, self.rows)],
+        }
+
+        if answers:
+            names_from_mask = dataset.species_index.names_from_mask
+            result["answers"] = [
+                [names_from_mask(mask) for mask in row] for row in self.intersections
+            ]
+
+        return result
+
+    @classmethod
+    def from_dict(cls, data: dict, dataset: GameDataset) -> "Puzzle":
+        col_ids = [col["id"] for col in data["cols"]]
+        row_ids = [row["id"] for row in data["rows"]]
+        puzzle = cls(data["seed"], col_ids, row_ids, dataset)
+
+        # Property indices are only meaningful for the dataset they were generated from
+        labels = [col["label"] for col in data["cols"]] + [row["label"] for row in data["rows"]]
+        if labels != [prop[0] for prop in puzzle.cols + puzzle.rows]:
+            raise ValueError("Puzzle does not match the dataset properties")
+
+        return puzzle
+
+
+class GameState:
+    """
+    Progress on one puzzle: board with accepted answers (None if empty) and attempt count
+    """
+
+    def __init__(self, puzzle: Puzzle) -> None:
+        self.puzzle = puzzle
+        self.board = BoardState(len(puzzle.rows), len(puzzle.cols))
+        # Remaining feasible assignment, updated on every accepted answer
+        self.solver = BoardSolver(puzzle.intersections)
+        self.attempts = 0
+
+    def accept(self, row: int, col: int, name: str, species_id: int) -> None:
+        self.board.fill(row, col, name)
+        self.solver.fill(row, col, species_id)
+
+    @property
+    def answers(self) -> list:
+        return self.board.answers
+
+    def is_used(self, name: str) -> bool:
+        return self.board.is_used(name)
+
+    def is_won(self) -> bool:
+        return self.board.is_complete()
+
+    def to_dict(self, dataset: GameDataset) -> dict:
+        return {
+            "puzzle": self.puzzle.to_dict(dataset),
+            "answers": self.answers,
+            "attempts": self.attempts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, dataset: GameDataset) -> "GameState":
+        state = cls(Puzzle.from_dict(data["puzzle"], dataset))
+        for row, answers in enumerate(data["answers"]):
+            for col, name in enumerate(answers):
+                if name is not None:
+                    state.accept(row, col, name, dataset.species_index.get_id(name))
+        state.attempts = data["attempts"]
+
+        return state
+
+
+class GameEngine:
+    """
+    Headless game logic, no Tk involved
+    generate(seed) is deterministic for a given seed, dataset and grid size
+    Every generated puzzle can be finished with distinct species (checked by bipartite matching)
+    """
+
+    def __init__(
+        self, dataset: GameDataset, min_common: int = 3, rows: int = 3, cols: int = 3,
+        max_samples: int = 50,
+    ) -> None:
+        self.dataset = dataset
+        self.rows = rows
+        self.cols = cols
+        self.max_samples = max_samples
+        # Property pairs with at least min_common common species
+        self.graph = CompatibilityGraph(dataset.properties, min_common, rows == cols == 3)
+        self.generator = GridGenerator(self.graph, rows, cols)
+        self.popularity = self.get_popularity()
+        self.state = None
+        # Layouts sampled by the last generate, 0 when it went straight to the backtracking search
+        self.last_tries = 0
+        # Trait query index, built on the first query
+        self.species_query = None
+
+    def get_popularity(self) -> list:
+        """
+        Returns the number of properties per species ID, used to rank hints by rarity
+        """
+
+        popularity = [0] * len(self.dataset.species_index)
+        for _, mask in self.dataset.properties:
+            for species_id in self.dataset.species_index.ids_from_mask(mask):
+                popularity[species_id] += 1
+
+        return popularity
+
+    def refresh(self, summary: dict) -> None:
+        """
+        Follows a dataset update (summary of GameDataset.apply_changes)
+        Species IDs may have moved, so the current game is dropped
+        """
+
+        if summary["layout_changed"]:
+            self.graph = CompatibilityGraph(
+                self.dataset.properties, self.graph.min_common, self.rows == self.cols == 3
+            )
+        else:
+            self.graph.update(self.dataset.properties, summary["changed"])
+        self.generator = GridGenerator(self.graph, self.rows, self.cols)
+        self.popularity = self.get_popularity()
+        self.state = None
+        self.species_query = None
+
+    def query(self, text: str, offset: int = 0, limit: int = 50) -> dict:
+        """
+        Species matching a trait query (see data/species_query.py), eg. 'Gram Stain: Negative AND Shape: Rod'
+        Returns {"count", "offset", "names"}, raises ValueError for invalid queries
+        """
+
+        if self.species_query is None:
+            self.species_query = SpeciesQuery(self.dataset)
+
+        return self.species_query.search(text, offset, limit)
+
+    @timed("generate")
+    def generate(self, seed: int | None = None) -> Puzzle:
+        # Unseeded puzzles still get a seed so they can be reproduced
+        if seed is None:
+            seed = random.randrange(2**32)
+
+        rng = random.Random(seed)
+        col_ids, row_ids = self.sample_layout(rng)
+
+        return Puzzle(seed, col_ids, row_ids, self.dataset)
+
+    def sample_layout(self, rng: random.Random) -> tuple:
+        """
+        3x3 draws uniformly from the graph and keeps the first solvable layout
+        Other sizes, or a dataset where that keeps failing, use the bounded backtracking search
+        """
+
+        self.last_tries = 0
+        if self.graph.count_grids:
+            with timed_block("generate.sample"):
+                layout = self.sample_solvable(rng)
+            if layout is not None:
+                count("generate.rejected", self.last_tries - 1)
+                return layout
+
+        count("generate.rejected", self.last_tries)
+        count("generate.fallback")
+
+        with timed_block("generate.search"):
+            return self.generator.generate(rng)
+
+    def sample_solvable(self, rng: random.Random) -> tuple | None:
+        for _ in range(self.max_samples):
+            layout = self.graph.sample(rng)
+            # No valid layout at all
+            if layout is None:
+                return None
+            self.last_tries += 1
+            if self.generator.is_solvable(*layout):
+                return layout
+
+        return None
+
+    def new_game(self, seed: int | None = None) -> GameState:
+        return self.start(self.generate(seed))
+
+    def start(self, puzzle: Puzzle) -> GameState:
+        """
+        Starts a game on a ready puzzle (eg. from PuzzleProducer)
+        """
+
+        self.state = GameState(puzzle)
+
+        return self.state
+
+    def is_correct_answer(self, row: int, col: int, name: str) -> bool:
+        intersection = self.state.puzzle.intersections[row][col]
+
+        return self.dataset.species_index.contains(intersection, name)
+
+    @timed("guess.check")
+    def check(self, row: int, col: int, name: str) -> bool:
+        """
+        Counts an attempt, accepts the answer if it fits the cell and isn't used yet
+        Returns bool
+        """
+
+        state = self.state
+        state.attempts += 1
+
+        if state.board.is_filled(row, col):
+            count("guess.wrong")
+            return False
+
+        if not self.is_correct_answer(row, col, name) or state.is_used(name):
+            count("guess.wrong")
+            return False
+
+        state.accept(row, col, name, self.dataset.species_index.get_id(name))
+        count("guess.correct")
+
+        return True
+
+    def is_dead(self) -> bool:
+        """
+        True if the accepted answers left no way to finish the board
+        """
+
+        return self.state.solver.is_dead()
+
+    def count_completions(self, limit: int = 10000) -> int:
+        return self.state.solver.count_completions(limit)
+
+    @timed("hint")
+    def hint(self, row: int | None = None, col: int | None = None) -> tuple | None:
+        """
+        Returns (row, col, name) with the rarest species that keeps the board solvable
+        Without a cell, hints the open cell with the fewest options
+        Returns None on a finished or dead board
+        """
+
+        solver = self.state.solver
+        if solver.is_dead() or not solver.cell_masks:
+            return None
+
+        if row is None or col is None:
+            row, col = min(solver.cell_masks, key=lambda cell: solver.get_options(cell).bit_count())
+
+        species_id = solver.hint((row, col), self.popularity)
+        if species_id is None:
+            return None
+
+        return (row, col, self.dataset.species_index.names[species_id])
@@ -0,0 +1,175 @@
+import random
+import time
+from data.compatibility_graph import CompatibilityGraph
+from engine.matching import is_solvable
+
+
+class GridSearch:
+    """
+    State of one generate call: rng, node count and deadline
+    Kept apart from GridGenerator, so threads sharing a generator don't share a budget
+    """
+
+    def __init__(self, rng: random.Random, max_nodes: int, time_limit: float | None) -> None:
+        self.rng = rng
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
+        self.exhausted = False
+        # Last node the current column set may use for its rows
+        self.row_limit = 0
+
+    def step(self) -> bool:
+        """
+        Counts a node, returns False once the node or time budget is spent
+        """
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (self.deadline is not None and time.monotonic() >= self.deadline):
+            self.exhausted = True
+
+        return not self.exhausted
+
+
+class GridGenerator:
+    """
+    Backtracking search for N x M grids over the compatibility graph
+    Columns are chosen one by one, pruned when fewer than N compatible rows remain
+    Rows are chosen one by one from those candidates, pruned when the partial grid has no matching,
+    so the board can be finished with distinct species
+    max_nodes and time_limit (seconds) bound the work per generate call,
+    row_nodes the row search of one column set before other columns are tried
+    """
+
+    def __init__(
+        self, graph: CompatibilityGraph, rows: int = 3, cols: int = 3,
+        max_nodes: int = 200000, time_limit: float | None = 10.0, row_nodes: int = 2000,
+    ) -> None:
+        self.graph = graph
+        self.rows = rows
+        self.cols = cols
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.row_nodes = row_nodes
+        self.masks = [prop[1] for prop in graph.properties]
+
+    def is_solvable(self, col_ids: list, row_ids: list) -> bool:
+        cell_masks = [self.masks[row] & self.masks[col] for row in row_ids for col in col_ids]
+
+        return is_solvable(cell_masks)
+
+    def generate(self, rng: random.Random = random) -> tuple:
+        """
+        Returns (column property indices, row property indices)
+        Raises ValueError if no solvable grid is found within max_nodes or time_limit
+        """
+
+        search = GridSearch(rng, self.max_nodes, self.time_limit)
+        adjacency = self.graph.adjacency
+        # A column needs rows compatible properties and rows distinct species, a row the same for cols
+        order = [
+            i for i, mask in enumerate(self.masks)
+            if adjacency[i].bit_count() >= self.rows and mask.bit_count() >= self.rows
+        ]
+        rng.shuffle(order)
+        row_pool = 0
+        for i, mask in enumerate(self.masks):
+            if adjacency[i].bit_count() >= self.cols and mask.bit_count() >= self.cols:
+                row_pool |= 1 << i
+
+        result = self.choose_cols(search, order, 0, [], row_pool)
+        if result is None:
+            raise ValueError(
+                f"No solvable {self.rows}x{self.cols} grid found within {search.nodes} search nodes"
+            )
+
+        col_ids, row_ids = result
+        rng.shuffle(col_ids)
+
+        return (col_ids, row_ids)
+
+    def choose_cols(self, search: GridSearch, order: list, start: int, col_ids: list, candidates: int):
+        """
+        Depth first over column combinations (in shuffled order)
+        candidates is the bitmask of row properties compatible with every chosen column
+        Returns (col_ids, row_ids) or None
+        """
+
+        if len(col_ids) == self.cols:
+            row_ids = self.choose_rows(search, candidates, col_ids)
+            return None if row_ids is None else (list(col_ids), row_ids)
+
+        adjacency = self.graph.adjacency
+
+        for position in range(start, len(order)):
+            if not search.step():
+                return None
+
+            # Not enough properties left to fill the remaining columns
+            if len(order) - position < self.cols - len(col_ids):
+                return None
+
+            col_id = order[position]
+            next_candidates = candidates & adjacency[col_id]
+            if next_candidates.bit_count() < self.rows:
+                continue
+
+            col_ids.append(col_id)
+            if self.has_species_for_rows(col_ids, next_candidates):
+                result = self.choose_cols(search, order, position + 1, col_ids, next_candidates)
+            else:
+                result = None
+            col_ids.pop()
+
+            if result is not None or search.exhausted:
+                return result
+
+        return None
+
+    def has_species_for_rows(self, col_ids: list, candidates: int) -> bool:
+        """
+        Every column needs rows distinct species shared with the candidate rows, checked with one union
+        """
+
+        union = 0
+        for i in range(len(self.masks)):
+            if candidates >> i & 1:
+                union |= self.masks[i]
+
+        return all((self.masks[col_id] & union).bit_count() >= self.rows for col_id in col_ids)
+
+    def choose_rows(self, search: GridSearch, candidates: int, col_ids: list) -> list | None:
+        """
+        Depth first over row combinations from the compatible candidates (in random order)
+        """
+
+        candidate_ids = [i for i in range(len(self.masks)) if candidates >> i & 1]
+        search.rng.shuffle(candidate_ids)
+        search.row_limit = search.nodes + self.row_nodes
+
+        return self.extend_rows(search, candidate_ids, 0, [], col_ids)
+
+    def extend_rows(
+        self, search: GridSearch, candidate_ids: list, start: int, row_ids: list, col_ids: list
+    ) -> list | None:
+        if len(row_ids) == self.rows:
+            return list(row_ids)
+
+        for position in range(start, len(candidate_ids)):
+            if not search.step() or search.nodes > search.row_limit:
+                return None
+
+            # Not enough candidates left to fill the remaining rows
+            if len(candidate_ids) - position < self.rows - len(row_ids):
+                return None
+
+            row_ids.append(candidate_ids[position])
+            # A grid whose first rows can't get distinct species never becomes solvable
+            if self.is_solvable(col_ids, row_ids):
+                result = self.extend_rows(search, candidate_ids, position + 1, row_ids, col_ids)
+                if result is not None:
+                    row_ids.pop()
+                    return result
+            row_ids.pop()
+
+        return None
@@ -0,0 +1,86 @@
+from collections import deque
+from data.species_index import SpeciesIndex
+from instrumentation import timed_block
+
+
+def hopcroft_karp(adjacency: list) -> dict:
+    """
+    Maximum bipartite matching
+    adjacency[u] lists the right vertices (eg. species IDs) of left vertex u (eg. a cell)
+    Returns {left: right} of the matched pairs
+    """
+
+    left_match = [None] * len(adjacency)
+    right_match = {}
+    distance = [0] * len(adjacency)
+
+    def bfs() -> bool:
+        queue = deque()
+        for u in range(len(adjacency)):
+            if left_match[u] is None:
+                distance[u] = 0
+                queue.append(u)
+            else:
+                distance[u] = -1
+
+        found = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = right_match.get(v)
+                if w is None:
+                    found = True
+                elif distance[w] == -1:
+                    distance[w] = distance[u] + 1
+                    queue.append(w)
+
+        return found
+
+    def dfs(u: int) -> bool:
+        for v in adjacency[u]:
+            w = right_match.get(v)
+            if w is None or (distance[w] == distance[u] + 1 and dfs(w)):
+                left_match[u] = v
+                right_match[v] = u
+                return True
+
+        # Dead end for this phase
+        distance[u] = -1
+
+        return False
+
+    while bfs():
+        for u in range(len(adjacency)):
+            if left_match[u] is None:
+                dfs(u)
+
+    return {u: v for u, v in enumerate(left_match) if v is not None}
+
+
+def is_solvable(cell_masks: list) -> bool:
+    """
+    True if every cell can get a distinct species
+    cell_masks is a flat list of species bitmasks, one per cell
+    """
+
+    # Pigeonhole check first, it's a single OR and popcount
+    union = 0
+    for mask in cell_masks:
+        union |= mask
+    if union.bit_count() < len(cell_masks):
+        return False
+
+    # Greedy on bitmasks, most constrained cell first, settles most boards without a matching
+    used = 0
+    for mask in sorted(cell_masks, key=int.bit_count):
+        free = mask & ~used
+        if not free:
+            break
+        used |= free & -free
+    else:
+        return True
+
+    # Timed apart from the checks above, shows how often boards need the full matching
+    with timed_block("matching.hopcroft_karp"):
+        adjacency = [SpeciesIndex.ids_from_mask(mask) for mask in cell_masks]
+        return len(hopcroft_karp(adjacency)) == len(cell_masks)
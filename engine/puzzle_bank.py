@@ -0,0 +1,331 @@
+"""
+Fixed record binary puzzle bank, read through mmap without loading it into Python objects
+
+Build from an enumerated catalogue (needs numpy) or by generating puzzles:
+    python -m engine.puzzle_bank build -o bank.bin --catalogue catalogue
+    python -m engine.puzzle_bank build -o bank.bin --generate 100000 --seed 0
+    python -m engine.puzzle_bank info bank.bin
+
+Layout: header (HEADER) then records sorted by difficulty, easiest first
+Record: row property ids, column property ids (uint16), difficulty (float32),
+total valid answers (uint32), minimum cell intersection (uint32)
+
+Difficulty of a cell is 1 / (1 + sum of answer commonness), commonness being the share of
+properties a species belongs to. Few and rare answers make a cell hard, the grid is the mean over cells.
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from data.game_dataset import GameDataset
+from data.species_index import SpeciesIndex
+from engine.game_engine import Puzzle
+
+BANK_MAGIC = b"MGBANK\0\0"
+BANK_VERSION = 2
+# magic, version, rows, cols, record size, record count, dataset fingerprint (sha256)
+HEADER = struct.Struct("<8sHHHHQ32s")
+# Difficulty rank ranges, eg. easy is the easiest third of the bank
+DIFFICULTY_BANDS = {
+    "any": (0.0, 1.0),
+    "easy": (0.0, 1 / 3),
+    "medium": (1 / 3, 2 / 3),
+    "hard": (2 / 3, 1.0),
+}
+
+
+def get_record_struct(rows: int, cols: int) -> struct.Struct:
+    return struct.Struct(f"<{rows}H{cols}HfII")
+
+
+def get_species_weights(popularity: list) -> list:
+    """
+    Returns commonness per species ID: properties containing it / most properties of any species
+    popularity is GameEngine.popularity
+    """
+
+    most = max(popularity, default=0) or 1
+
+    return [count / most for count in popularity]
+
+
+def get_difficulty(cell_masks: list, weights: list) -> float:
+    total = 0.0
+    for mask in cell_masks:
+        total += 1 / (1 + sum(weights[species_id] for species_id in SpeciesIndex.ids_from_mask(mask)))
+
+    return total / len(cell_masks)
+
+
+class PuzzleBank:
+    """
+    Read-only view of a bank file, records are decoded only when accessed
+    get(index) is O(1), difficulty bands are found by binary search over the sorted records
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.rows, self.cols, record_size, self.count, fingerprint = (
+            HEADER.unpack_from(self.mmap, 0)
+        )
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f"{path} is not a version {BANK_VERSION} puzzle bank")
+
+        self.record = get_record_struct(self.rows, self.cols)
+        if record_size != self.record.size or len(self.mmap) != HEADER.size + self.count * record_size:
+            raise ValueError(f"{path} is truncated or corrupt")
+
+        self.fingerprint = fingerprint.hex()
+        # Offset of the difficulty field inside a record
+        self.difficulty_offset = 2 * (self.rows + self.cols)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.mmap.close()
+
+    def get(self, index: int) -> dict:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+
+        values = self.record.unpack_from(self.mmap, HEADER.size + index * self.record.size)
+        split = self.rows + self.cols
+
+        return {
+            "index": index,
+            "row_ids": list(values[: self.rows]),
+            "col_ids": list(values[self.rows : split]),
+            "difficulty": values[split],
+            "answers": values[split + 1],
+            "min_intersection": values[split + 2],
+        }
+
+    def get_difficulty(self, index: int) -> float:
+        offset = HEADER.size + index * self.record.size + self.difficulty_offset
+
+        return struct.unpack_from("<f", self.mmap, offset)[0]
+
+    def get_band(self, low: float, high: float) -> tuple:
+        """
+        Returns (start, end) record range with low <= difficulty < high
+        """
+
+        # Binary search reads only log2(count) records
+        start = bisect.bisect_left(range(self.count), low, key=self.get_difficulty)
+        end = bisect.bisect_left(range(self.count), high, start, key=self.get_difficulty)
+
+        return (start, end)
+
+    def sample(self, rng: random.Random = random, low: float = 0.0, high: float = float("inf")) -> dict:
+        start, end = self.get_band(low, high)
+        if start == end:
+            raise ValueError(f"No puzzle with difficulty in [{low}, {high})")
+
+        return self.get(rng.randrange(start, end))
+
+    def sample_rank(self, rng: random.Random = random, low: float = 0.0, high: float = 1.0) -> dict:
+        """
+        Samples by difficulty rank, eg. (0, 1/3) is the easiest third, O(1)
+        """
+
+        if not self.count:
+            raise ValueError("Puzzle bank is empty")
+
+        start = int(low * self.count)
+        end = max(start + 1, int(high * self.count))
+
+        return self.get(rng.randrange(start, min(end, self.count)))
+
+    def check_dataset(self, dataset: GameDataset) -> None:
+        if dataset.get_fingerprint() != self.fingerprint:
+            raise ValueError("Puzzle bank was built for different dataset properties")
+
+    def get_puzzle(self, entry: dict, dataset: GameDataset) -> Puzzle:
+        # Bank puzzles have no seed to reproduce them
+        return Puzzle(None, entry["col_ids"], entry["row_ids"], dataset)
+
+    def draw(self, dataset: GameDataset, band: str = "any", rng: random.Random = random) -> Puzzle:
+        """
+        Returns a puzzle from a difficulty band (see DIFFICULTY_BANDS)
+        Records are stored in sorted property order, rows and columns are shuffled for display
+        """
+
+        entry = self.sample_rank(rng, *DIFFICULTY_BANDS[band])
+        rng.shuffle(entry["row_ids"])
+        rng.shuffle(entry["col_ids"])
+
+        return self.get_puzzle(entry, dataset)
+
+
+def write_bank(path: str, rows: int, cols: int, fingerprint: str, records: bytes, count: int) -> None:
+    record = get_record_struct(rows, cols)
+    header = HEADER.pack(
+        BANK_MAGIC, BANK_VERSION, rows, cols, record.size, count, bytes.fromhex(fingerprint)
+    )
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(header)
+        file.write(records)
+    os.replace(tmp_path, path)
+
+
+def get_pair_weights(dataset: GameDataset, chunk_bytes: int = 2048) -> "np.ndarray":
+    """
+    Returns the property x property matrix of summed commonness of common species (needs numpy)
+    Masks stay packed, bits are unpacked chunk_bytes * 8 species at a time,
+    so memory grows with properties x chunk instead of properties x species
+    """
+
+    import numpy as np
+
+    byte_count = (len(dataset.species_index) + 7) // 8
+    packed = np.array(
+        [np.frombuffer(mask.to_bytes(byte_count, "little"), dtype=np.uint8) for _, mask in dataset.properties],
+        dtype=np.uint8,
+    ).reshape(len(dataset.properties), byte_count)
+
+    # Properties per species, padding bits count 0
+    popularity = np.zeros(byte_count * 8, dtype=np.int64)
+    for start in range(0, byte_count, chunk_bytes):
+        chunk = np.unpackbits(packed[:, start : start + chunk_bytes], axis=1, bitorder="little")
+        popularity[start * 8 : start * 8 + chunk.shape[1]] = chunk.sum(axis=0)
+    # Same as get_species_weights
+    weights = popularity / (popularity.max(initial=0) or 1)
+
+    pair_weight = np.zeros((len(packed), len(packed)))
+    for start in range(0, byte_count, chunk_bytes):
+        chunk = np.unpackbits(packed[:, start : start + chunk_bytes], axis=1, bitorder="little").astype(np.float64)
+        pair_weight += (chunk * weights[start * 8 : start * 8 + chunk.shape[1]]) @ chunk.T
+
+    return pair_weight
+
+
+def build_from_catalogue(catalogue_dir: str, dataset: GameDataset, output: str) -> int:
+    """
+    Scores every catalogue grid with numpy and writes them sorted by difficulty
+    """
+
+    import numpy as np
+    from engine.enumerate_grids import CATALOGUE_VERSION
+
+    with open(os.path.join(catalogue_dir, "manifest.json"), "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != CATALOGUE_VERSION:
+        raise ValueError(f"{catalogue_dir} is not a version {CATALOGUE_VERSION} catalogue")
+    if not manifest.get("complete"):
+        raise ValueError(f"{catalogue_dir} is not a complete catalogue")
+    if manifest["fingerprint"] != dataset.get_fingerprint():
+        raise ValueError("Catalogue was built for different dataset properties")
+
+    size = manifest["size"]
+    grids = np.fromfile(
+        os.path.join(catalogue_dir, "grids.bin"),
+        dtype=np.dtype([("cols", "<u2", (size,)), ("rows", "<u2", (size,)), ("min", "<u4"), ("total", "<u4")]),
+    )
+
+    pair_weight = get_pair_weights(dataset)
+
+    difficulty = np.zeros(len(grids))
+    for i in range(size):
+        for j in range(size):
+            difficulty += 1 / (1 + pair_weight[grids["rows"][:, i], grids["cols"][:, j]])
+    difficulty /= size * size
+
+    order = np.argsort(difficulty, kind="stable")
+    bank = np.zeros(
+        len(grids),
+        dtype=np.dtype([("rows", "<u2", (size,)), ("cols", "<u2", (size,)), ("difficulty", "<f4"), ("answers", "<u4"), ("min", "<u4")]),
+    )
+    bank["rows"] = grids["rows"][order]
+    bank["cols"] = grids["cols"][order]
+    bank["difficulty"] = difficulty[order]
+    bank["answers"] = grids["total"][order]
+    bank["min"] = grids["min"][order]
+
+    write_bank(output, size, size, dataset.get_fingerprint(), bank.tobytes(), len(bank))
+
+    return len(bank)
+
+
+def build_from_generator(count: int, seed: int, rows: int, cols: int, dataset: GameDataset, output: str) -> int:
+    """
+    Generates puzzles with the engine (stdlib only), duplicates are skipped
+    """
+
+    from engine.game_engine import GameEngine
+
+    engine = GameEngine(dataset, rows=rows, cols=cols)
+    weights = get_species_weights(engine.popularity)
+    record = get_record_struct(rows, cols)
+
+    entries = {}
+    for puzzle_seed in range(seed, seed + count):
+        puzzle = engine.generate(puzzle_seed)
+        key = (tuple(puzzle.row_ids), tuple(puzzle.col_ids))
+        if key in entries:
+            continue
+
+        cell_masks = [mask for row in puzzle.intersections for mask in row]
+        sizes = [mask.bit_count() for mask in cell_masks]
+        entries[key] = (get_difficulty(cell_masks, weights), sum(sizes), min(sizes))
+
+    ordered = sorted(entries.items(), key=lambda item: item[1][0])
+    records = b"".join(record.pack(*row_ids, *col_ids, *values) for (row_ids, col_ids), values in ordered)
+    write_bank(output, rows, cols, dataset.get_fingerprint(), records, len(ordered))
+
+    return len(ordered)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Puzzle bank tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build a bank file")
+    build.add_argument("-o", "--output", required=True, help="bank file")
+    source = build.add_mutually_exclusive_group(required=True)
+    source.add_argument("--catalogue", help="catalogue directory from engine.enumerate_grids")
+    source.add_argument("--generate", type=int, help="number of puzzles to generate")
+    build.add_argument("--seed", type=int, default=0, help="seed of the first generated puzzle")
+    build.add_argument("--rows", type=int, default=3, help="grid rows when generating")
+    build.add_argument("--cols", type=int, default=3, help="grid columns when generating")
+    build.add_argument("--fast-start", action="store_true", help="load the compact artifact")
+
+    info = commands.add_parser("info", help="print bank summary")
+    info.add_argument("bank", help="bank file")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == "info":
+        bank = PuzzleBank(args.bank)
+        print(f"{len(bank)} puzzles, {bank.rows}x{bank.cols}, fingerprint {bank.fingerprint[:12]}")
+        if len(bank):
+            for rank in (0, 0.25, 0.5, 0.75, 1):
+                index = min(int(rank * len(bank)), len(bank) - 1)
+                print(f"  difficulty at {rank:>4.0%}: {bank.get_difficulty(index):.4f}")
+        return
+
+    from data.data_utils import load_game_dataset
+
+    dataset = load_game_dataset(args.fast_start)
+    if args.catalogue:
+        count = build_from_catalogue(args.catalogue, dataset, args.output)
+    else:
+        count = build_from_generator(args.generate, args.seed, args.rows, args.cols, dataset, args.output)
+
+    print(f"Bank written to {args.output}: {count} puzzles")
+
+
+if __name__ == "__main__":
+    main()
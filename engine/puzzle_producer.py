@@ -0,0 +1,97 @@
+import queue
+import sys
+import threading
+from engine.game_engine import GameEngine, Puzzle
+from instrumentation import count, timed
+
+# Pause after a failed generation, a dataset that keeps failing doesn't spin the worker
+ERROR_DELAY = 1.0
+# Wait in stop() for a generation in progress, generation normally takes milliseconds
+STOP_TIMEOUT = 5.0
+
+
+class PuzzleProducer:
+    """
+    Keeps a bounded queue of ready puzzles, filled by a daemon worker thread
+    get() pops a ready puzzle, it only generates in the caller's thread if the queue is empty
+    Generation errors in the worker are logged and reported by get_stats, the worker keeps going
+    With --profile, 'producer.get' times every get (the wait behind Restart)
+    """
+
+    def __init__(self, engine: GameEngine, size: int = 4) -> None:
+        self.engine = engine
+        self.queue = queue.Queue(maxsize=size)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.fill, name="PuzzleProducer", daemon=True)
+        # Ready and synchronously generated puzzles handed out
+        self.hits = 0
+        self.misses = 0
+        self.last_error = None
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> bool:
+        """
+        Stops the worker and waits for a generation in progress, so the engine can be changed afterwards
+        Returns False if the worker is still running after timeout
+        """
+
+        self.stop_event.set()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        if self.thread.is_alive():
+            print("Puzzle producer did not stop in time", file=sys.stderr)
+            return False
+
+        return True
+
+    def fill(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                puzzle = self.engine.generate()
+            except Exception as error:
+                self.last_error = error
+                count("producer.error")
+                print(f"Puzzle generation failed: {error}", file=sys.stderr)
+                self.stop_event.wait(ERROR_DELAY)
+                continue
+
+            # Wake up regularly so stop() is noticed while the queue is full
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(puzzle, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def try_get(self) -> Puzzle | None:
+        """
+        Pops a ready puzzle without generating, None (counted as a miss) when the queue is empty
+        """
+
+        try:
+            puzzle = self.queue.get_nowait()
+        except queue.Empty:
+            self.misses += 1
+            count("producer.miss")
+            return None
+
+        self.hits += 1
+        count("producer.hit")
+
+        return puzzle
+
+    @timed("producer.get")
+    def get(self) -> Puzzle:
+        puzzle = self.try_get()
+
+        return puzzle if puzzle is not None else self.engine.generate()
+
+    def get_stats(self) -> dict:
+        return {
+            "ready": self.queue.qsize(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "last_error": None if self.last_error is None else repr(self.last_error),
+        }
@@ -0,0 +1,150 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Off unless --profile or MICROBES_GRID_PROFILE=1 is given when the first module imports this one
+ENABLED = "--profile" in sys.argv or os.environ.get("MICROBES_GRID_PROFILE") == "1"
+
+
+class Instrumentation:
+    """
+    Named timers (count, total, max) and counters for the hot paths, plus a cProfile of the main thread
+    Disabled, timed() returns functions unchanged and count() returns at once
+    Output goes to MICROBES_GRID_PROFILE_DIR (default: working directory) on exit or on dump()
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        # name -> [calls, total seconds, max seconds]
+        self.timers = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.profiler = None
+        # StartupTimer whose phases go into the summary
+        self.startup_timer = None
+
+    def start(self) -> None:
+        if not self.enabled or self.profiler is not None:
+            return
+
+        import cProfile
+
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        atexit.register(self.dump)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def get_summary(self) -> str:
+        lines = []
+        if self.startup_timer is not None and self.startup_timer.phases:
+            lines.append("Startup phases:")
+            for name, elapsed, modules in self.startup_timer.phases:
+                lines.append(f"  {name:<28}{elapsed * 1000:>10.1f} ms  (+{modules} modules)")
+
+        with self.lock:
+            timers = sorted(self.timers.items(), key=lambda item: -item[1][1])
+            counters = sorted(self.counters.items())
+
+        lines.append("Timers:")
+        lines.append(f"  {'name':<28}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}")
+        for name, (calls, total, longest) in timers:
+            lines.append(f"  {name:<28}{calls:>8}{total * 1000:>12.1f}{total * 1000 / calls:>10.3f}{longest * 1000:>10.3f}")
+        lines.append("Counters:")
+        for name, value in counters:
+            lines.append(f"  {name:<28}{value:>8}")
+
+        return "\n".join(lines)
+
+    def dump(self) -> str | None:
+        """
+        Writes the cProfile stats (.prof, readable with pstats or snakeviz) and the summary (.txt)
+        Returns the path without suffix
+        """
+
+        if not self.enabled:
+            return None
+
+        directory = os.environ.get("MICROBES_GRID_PROFILE_DIR") or os.getcwd()
+        base = os.path.join(directory, f"microbes-grid-{time.strftime('%Y%m%d-%H%M%S')}")
+        summary = self.get_summary()
+
+        if self.profiler is not None:
+            import pstats
+
+            self.profiler.disable()
+            self.profiler.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(self.profiler)
+            self.profiler.enable()
+            with open(f"{base}.txt", "w", encoding="utf-8") as file:
+                file.write(summary + "\n\n")
+                stats.stream = file
+                stats.sort_stats("cumulative").print_stats(40)
+        else:
+            with open(f"{base}.txt", "w", encoding="utf-8") as file:
+                file.write(summary + "\n")
+
+        print(summary)
+        print(f"Profile written to {base}.txt")
+
+        return base
+
+
+INSTRUMENTS = Instrumentation(ENABLED)
+
+
+def timed(name: str):
+    """
+    Decorator recording the call time under name, applied only when profiling is on
+    """
+
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                INSTRUMENTS.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def timed_block(name: str):
+    if not ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INSTRUMENTS.record(name, time.perf_counter() - start)
+
+
+def count(name: str, amount: int = 1) -> None:
+    if ENABLED:
+        INSTRUMENTS.count(name, amount)
@@ -1,19 +1,45 @@
-import random
+# Imported first, startup times are measured from here
+from startup_timer import StartupTimer
+import argparse
+import os
+import sys
+import threading
 import tkinter as tk
-from ui.game_interface import GameInterface
-from data.game_dataset import GameDataset
-from data.data_utils import DATASET
+from data.data_utils import get_source_file, load_game_dataset
+from engine.answer_stats import AnswerStats
+from engine.game_engine import GameEngine
+from engine.puzzle_bank import DIFFICULTY_BANDS, PuzzleBank
+from engine.puzzle_producer import PuzzleProducer
+from instrumentation import INSTRUMENTS, timed
 
 
 class MicrobesGrid:
-    def __init__(self) -> None:
-        self.width = 1280
-        self.height = 760
+    def __init__(
+        self, fast_start: bool = False, timer: StartupTimer = None, rows: int = 3, cols: int = 3,
+        bank_path: str | None = None, difficulty: str = "any",
+    ) -> None:
+        self.fast_start = fast_start
+        self.timer = timer or StartupTimer()
+        self.difficulty = difficulty
+        # Pre-built puzzle bank, games are drawn from it instead of generated
+        self.bank = None
+        if bank_path is not None:
+            with self.timer.phase("open puzzle bank"):
+                self.bank = PuzzleBank(bank_path)
+            rows, cols = self.bank.rows, self.bank.cols
+        self.grid_rows = rows
+        self.grid_cols = cols
+        # Window grows with grid size, 3x3 keeps the original size
+        self.width = max(1280, 300 * (cols + 1))
+        self.height = max(760, 150 * (rows + 2))
         self.cols = []
         self.rows = []
         self.game_fields = []
         self.intersections = []
-        self.attempts = 0
+        self.watcher = None
+        # Correct answers per property pair, for rarity
+        self.answer_stats = AnswerStats()
+        self.answer_stats.start()
 
         self.init_dataset()
         self.generate_game()
@@ -23,115 +49,254 @@ class MicrobesGrid:
         """
         Initiate dataset to work from
         All species is a list of strings (eg. 'Staphylococcus aureus')
-        Properties is a list of tuples: [0] is the property definition, [1] is the list of names
+        Properties is a list of tuples: [0] is the property definition, [1] is the species bitmask
         """
 
-        self.dataset = GameDataset(DATASET)
-        self.dataset.get_all_species()
-        self.dataset.get_properties()
+        with self.timer.phase("load dataset"):
+            self.dataset = load_game_dataset(self.fast_start, keep_frame=False)
 
+        # Headless game logic, builds the graph of property pairs with at least 3 common species
+        with self.timer.phase("compatibility graph"):
+            self.engine = GameEngine(self.dataset, rows=self.grid_rows, cols=self.grid_cols)
+        # Only counted for the default 3x3 grid, O(properties^3) so off the startup path
+        if self.engine.graph.count_grids:
+            threading.Thread(target=self.print_grid_count, name="GridCount", daemon=True).start()
 
-    def generate_game(self) -> None:
+        if self.bank is not None:
+            self.bank.check_dataset(self.dataset)
+            self.producer = None
+            return
+
+        # Puzzles for Restart are generated in the background
+        self.producer = PuzzleProducer(self.engine)
+        self.producer.start()
+
+
+    def print_grid_count(self) -> None:
+        # Through the engine, refresh() may have replaced its graph
+        print(f"Valid grids: {self.engine.graph.get_grid_count()}")
+
+
+    def watch_dataset(self, interval: float = 1.0) -> None:
+        """
+        Picks up edits of the dataset file while the game runs, see apply_dataset_updates
+        """
+
+        from data.dataset_watcher import DatasetWatcher
+
+        self.watcher = DatasetWatcher(self.dataset, get_source_file(), interval)
+        self.watcher.start()
+
+
+    def apply_dataset_updates(self) -> bool:
+        """
+        Applies pending dataset edits and starts a new game on the updated data
+        Returns bool, True if the game changed
+        """
+
+        summary = self.watcher.poll() if self.watcher is not None else None
+        if summary is None:
+            return False
+
+        print(
+            f"Dataset updated: {summary['added']} added, {summary['removed']} removed, "
+            f"{summary['modified']} modified"
+        )
+
+        # Queued puzzles were built on the old properties
+        if self.producer is not None:
+            self.producer.stop()
+        self.engine.refresh(summary)
+
+        if self.bank is not None:
+            # Bank property ids are only valid for the data it was built from
+            try:
+                self.bank.check_dataset(self.dataset)
+            except ValueError:
+                print("Puzzle bank no longer matches the dataset, generating puzzles instead")
+                self.bank = None
+
+        if self.bank is None:
+            self.producer = PuzzleProducer(self.engine)
+            self.producer.start()
+
+        self.restart_game()
+
+        return True
+
+
+    @timed("game.generate")
+    def generate_game(self, seed: int | None = None) -> None:
         """
         Sets up the game's main logic
-        Randomly get 3 properties (y values)
-        Get 3 more and check if there are enough intersection values
-        """
-
-        while True:
-            # Initiate 3 random columns
-            cols = random.sample(self.dataset.properties, 3)
-            cols_desc = [prop[0] for prop in cols]
-            rows = []
-
-            # Shuffle properties order
-            shuffled_properties = self.dataset.properties[:]
-            random.shuffle(shuffled_properties)
-
-            for prop in shuffled_properties:
-                # Return when all cols and rows got matched
-                if len(rows) == 3:
-                    self.rows = rows
-                    self.cols = cols
-                    return
-
-                # Unpack tuple
-                desc = prop[0]
-                name_list = prop[1]
-                name_list_set = set(name_list)
-
-                if desc in cols_desc:
-                    continue
-
-                # Check common values between cols and current row
-                common_1 = list(name_list_set & set(cols[0][1]))
-                common_2 = list(name_list_set & set(cols[1][1]))
-                common_3 = list(name_list_set & set(cols[2][1]))
-
-                # Check if there are at least 3 match in all 3 intersection
-                if len(common_1) >= 3 and len(common_2) >= 3 and len(common_3) >= 3:
-                    rows.append(prop)
-                    self.intersections.append([common_1, common_2, common_3])
-                    
-                    
+        The engine picks column and row properties from the compatibility graph
+        Every row and column pair has at least 3 common species and the board is solvable with distinct species
+        Intersections are stored as species bitmasks
+        """
+
+        if self.bank is not None and seed is None:
+            self.state = self.engine.start(self.bank.draw(self.dataset, self.difficulty))
+        else:
+            self.state = self.engine.new_game(seed)
+        self.set_puzzle()
+
+
+    def set_puzzle(self) -> None:
+        puzzle = self.state.puzzle
+
+        self.cols = puzzle.cols
+        self.rows = puzzle.rows
+        self.intersections = puzzle.intersections
+        # Counts of the board's cells are loaded before the first guess
+        self.answer_stats.preload((row[0], col[0]) for row in self.rows for col in self.cols)
+
+
+    @property
+    def attempts(self) -> int:
+        return self.state.attempts
+
+
+    def register_gamefield(self, button: tk.Button, row_index: int, col_index: int) -> None:
+        """
+        Stores the button and its grid position in the board state
+        """
+
+        self.game_fields.append(button)
+        self.state.board.register_cell(button, row_index, col_index)
+
+
     def get_gamefield_position(self, button: tk.Button) -> tuple:
         '''
-        Returns clicked button position in 3x3 grid
+        Returns clicked button position in the grid
         '''
 
-        cols_count = len(self.cols)
-        button_index = self.game_fields.index(button)
-        row_index = button_index // cols_count
-        col_index = button_index % cols_count
-        
-        return (row_index, col_index)
-                    
-                    
-    def is_existing_value(self, value: str) -> bool:
-        """
-        Checks if a name is already used
+        return self.state.board.get_position(button)
+
+
+    def is_answered(self, button: tk.Button) -> bool:
+        return self.state.board.is_filled(*self.get_gamefield_position(button))
+
+
+    def check_answer(self, row_index: int, col_index: int, value: str) -> bool:
+        """
+        Counts the attempt, accepts a correct name that isn't used yet
         Returns bool
         """
 
-        for button in self.game_fields:
-            # Transform previous answers line break back to space for comparison
-            button_text = button.cget("text").replace("\n", " ")
-            # True if answer is already used
-            if button_text == value:
-                return True
+        return self.engine.check(row_index, col_index, value)
+
+
+    def record_answer(self, row_index: int, col_index: int, value: str) -> dict | None:
+        """
+        Stores a correct answer, returns its rarity (see engine/answer_stats.py)
+        None when the stats store is unavailable
+        """
+
+        return self.answer_stats.record(self.rows[row_index][0], self.cols[col_index][0], value)
+
 
-        return False
-    
-    
-    def check_win(self, text_unknown) -> bool:
+    def get_hint(self) -> tuple | None:
+        """
+        Returns (row, col, name) of the rarest species that keeps the board solvable
+        """
+
+        return self.engine.hint()
+
+
+    def query_species(self, text: str, offset: int = 0, limit: int = 50) -> dict:
+        """
+        Returns {"count", "offset", "names"} of the species matching a trait query
+        """
+
+        return self.engine.query(text, offset, limit)
+
+
+    def is_dead(self) -> bool:
+        return self.engine.is_dead()
+
+
+    def check_win(self) -> bool:
         """
         Checks if all cells are answered correctly
         Returns bool
         """
 
-        for button in self.game_fields:
-            # Not win if there's still unknown
-            if button.cget("text") == text_unknown:
-                return False
+        return self.state.is_won()
 
-        return True
-    
-    
+
+    @timed("game.restart")
     def restart_game(self) -> None:
         """
         Empty all lists for new generation
-        Resets UI
+        Takes a ready puzzle from the background queue, or from the puzzle bank
         """
 
         self.cols = []
         self.rows = []
         self.game_fields = []
         self.intersections = []
-        self.attempts = 0
-        self.generate_game()
-    
-    
+        if self.bank is not None:
+            puzzle = self.bank.draw(self.dataset, self.difficulty)
+        else:
+            puzzle = self.producer.get()
+        self.state = self.engine.start(puzzle)
+        self.set_puzzle()
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbes Grid")
+    parser.add_argument("--fast-start", action="store_true", help="run from the compact artifact without pandas")
+    parser.add_argument("--startup-report", action="store_true", help="print where startup time goes")
+    parser.add_argument("--size", default="3x3", help="grid size as ROWSxCOLS (eg. 4x4)")
+    parser.add_argument("--bank", help="draw puzzles from a bank file (engine.puzzle_bank), sets the size")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY_BANDS), default="any", help="bank difficulty band")
+    parser.add_argument("--watch", action="store_true", help="apply edits of the dataset file while running")
+    parser.add_argument("--profile", action="store_true", help="record timers, counters and a cProfile, written on exit or with F12")
+
+    args = parser.parse_args(argv)
+    try:
+        args.rows, args.cols = (int(value) for value in args.size.lower().split("x"))
+    except ValueError:
+        parser.error(f"invalid --size {args.size!r}, expected ROWSxCOLS")
+
+    return args
+
+
+def main() -> None:
+    """
+    --fast-start (or MICROBES_GRID_FAST_START=1) runs from the compact artifact without pandas
+    --startup-report prints where startup time goes
+    --size 4x4 plays on a bigger grid
+    --bank bank.bin --difficulty hard plays pre-built puzzles of a difficulty band
+    --watch applies edits of the dataset file while the game runs
+    --profile (or MICROBES_GRID_PROFILE=1) writes timers, counters and a cProfile on exit or with F12
+    """
+
+    args = parse_args(sys.argv[1:])
+    timer = StartupTimer.from_environment(sys.argv)
+    if INSTRUMENTS.enabled:
+        # Startup phases are part of the profile summary
+        timer.enabled = True
+        INSTRUMENTS.startup_timer = timer
+        INSTRUMENTS.start()
+    fast_start = args.fast_start or os.environ.get("MICROBES_GRID_FAST_START") == "1"
+
+    with timer.phase("import ui"):
+        from ui.game_interface import GameInterface
+
+    game = MicrobesGrid(fast_start, timer, args.rows, args.cols, args.bank, args.difficulty)
+    if args.watch:
+        game.watch_dataset()
+
+    with timer.phase("build window"):
+        ui = GameInterface(game)
+        ui.root.update_idletasks()
+
+    timer.report()
+    ui.main_loop()
+    # Queued answers are committed before exit
+    game.answer_stats.close()
+
 
-game = MicrobesGrid()
-ui = GameInterface(game)
-ui.main_loop()
+if __name__ == "__main__":
+    main()
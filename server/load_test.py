@@ -0,0 +1,239 @@
+"""
+Load test for server.puzzle_server: sustained requests/sec and latency percentiles per endpoint
+
+    python -m server.load_test --spawn --clients 64 --duration 20
+    python -m server.load_test --host 192.168.1.10 --port 8080
+
+Every client keeps one connection open and plays like a player: starts a game (new or daily),
+types a few autocomplete queries, then answers cells until the game is won or a move limit is hit.
+--spawn starts a server subprocess on a free port and stops it afterwards.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+class Client:
+    """
+    Minimal HTTP/1.1 keep-alive JSON client
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    async def request(self, method: str, target: str, payload: dict | None = None) -> tuple:
+        """
+        Returns (status, JSON response)
+        """
+
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        head = (
+            f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+
+        lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        for line in lines[1:]:
+            key, _, value = line.partition(":")
+            if key.lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+
+        return (status, json.loads(data))
+
+
+def get_percentile(timings: list, fraction: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+class LoadTest:
+    def __init__(self, host: str, port: int, clients: int, duration: float, daily_share: float, seed: int) -> None:
+        self.host = host
+        self.port = port
+        self.clients = clients
+        self.duration = duration
+        self.daily_share = daily_share
+        self.rng = random.Random(seed)
+        # Endpoint -> latencies in ms
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.names = []
+
+    async def timed(self, client: Client, endpoint: str, method: str, target: str, payload: dict | None = None) -> dict:
+        start = time.perf_counter()
+        status, response = await client.request(method, target, payload)
+        self.timings[endpoint].append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            self.errors[endpoint] += 1
+
+        return response
+
+    async def play(self, client: Client, deadline: float) -> None:
+        rng = self.rng
+        while time.perf_counter() < deadline:
+            mode = "daily" if rng.random() < self.daily_share else "new"
+            game = await self.timed(client, f"games:{mode}", "POST", "/games", {"mode": mode})
+            game_id = game["game"]
+            rows, cols = len(game["puzzle"]["rows"]), len(game["puzzle"]["cols"])
+
+            for _ in range(3):
+                name = rng.choice(self.names)
+                await self.timed(client, "species", "GET", f"/species?q={name[: rng.randint(1, 6)].replace(' ', '+')}&limit=10")
+
+            for _ in range(rows * cols * 3):
+                if time.perf_counter() >= deadline:
+                    return
+                answer = {"row": rng.randrange(rows), "col": rng.randrange(cols), "name": rng.choice(self.names)}
+                result = await self.timed(client, "answer", "POST", f"/games/{game_id}/answer", answer)
+                if result.get("won"):
+                    break
+
+    async def run_client(self, deadline: float) -> None:
+        client = Client(self.host, self.port)
+        await client.connect()
+        try:
+            await self.play(client, deadline)
+        finally:
+            client.close()
+
+    async def run(self) -> dict:
+        client = Client(self.host, self.port)
+        await client.connect()
+        _, response = await client.request("GET", "/species?q=&limit=100")
+        self.names = response["names"]
+        # Warm the daily puzzle so the first wave doesn't measure its generation
+        await client.request("GET", "/puzzle/daily")
+        client.close()
+
+        start = time.perf_counter()
+        deadline = start + self.duration
+        await asyncio.gather(*(self.run_client(deadline) for _ in range(self.clients)))
+        elapsed = time.perf_counter() - start
+
+        return self.get_report(elapsed)
+
+    def get_report(self, elapsed: float) -> dict:
+        endpoints = {}
+        all_timings = []
+        for endpoint, timings in sorted(self.timings.items()):
+            all_timings.extend(timings)
+            timings.sort()
+            endpoints[endpoint] = {
+                "requests": len(timings),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(get_percentile(timings, 0.5), 3),
+                "p99_ms": round(get_percentile(timings, 0.99), 3),
+                "max_ms": round(timings[-1], 3),
+            }
+        all_timings.sort()
+
+        return {
+            "clients": self.clients,
+            "seconds": round(elapsed, 2),
+            "requests": len(all_timings),
+            "requests_per_s": round(len(all_timings) / elapsed, 1),
+            "p50_ms": round(get_percentile(all_timings, 0.5), 3) if all_timings else None,
+            "p99_ms": round(get_percentile(all_timings, 0.99), 3) if all_timings else None,
+            "endpoints": endpoints,
+        }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['clients']} clients, {report['seconds']} s: {report['requests']} requests, "
+        f"{report['requests_per_s']} req/s, p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms"
+    ]
+    for endpoint, stats in report["endpoints"].items():
+        lines.append(
+            f"  {endpoint:<12} {stats['requests']:>8}  p50 {stats['p50_ms']:8.3f} ms  "
+            f"p99 {stats['p99_ms']:8.3f} ms  max {stats['max_ms']:8.3f} ms  errors {stats['errors']}"
+        )
+
+    return "\n".join(lines)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port: int, fast_start: bool) -> subprocess.Popen:
+    command = [sys.executable, "-m", "server.puzzle_server", "--port", str(port)]
+    if fast_start:
+        command.append("--fast-start")
+    process = subprocess.Popen(command)
+
+    # Wait until the dataset is loaded and the port accepts connections
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("Server did not start within 120 s")
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Puzzle service load test")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=8080, help="server port")
+    parser.add_argument("--spawn", action="store_true", help="start a local server on a free port")
+    parser.add_argument("--fast-start", action="store_true", help="spawned server loads the compact artifact")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--daily-share", type=float, default=0.3, help="share of games on the daily puzzle")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the simulated players")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    process = None
+    host, port = args.host, args.port
+    if args.spawn:
+        host, port = "127.0.0.1", get_free_port()
+        process = spawn_server(port, args.fast_start)
+
+    try:
+        test = LoadTest(host, port, args.clients, args.duration, args.daily_share, args.seed)
+        report = asyncio.run(test.run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps(report, indent=1) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
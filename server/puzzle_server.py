@@ -0,0 +1,436 @@
+"""
+Puzzle and answer validation service for LAN play, standard library only (asyncio, HTTP/1.1 keep-alive, JSON)
+
+    python -m server.puzzle_server --host 0.0.0.0 --port 8080
+
+Endpoints:
+    GET  /puzzle/daily?date=YYYY-MM-DD     puzzle of the day (today by default), seeded by the date
+    POST /games          {"mode": "new"}   new game from the prefetch pool
+                         {"mode": "daily", "date": "YYYY-MM-DD"}
+                         returns {"game": id, "puzzle": {...}}, answers stay on the server
+    POST /games/<id>/answer  {"row": 0, "col": 2, "name": "Vibrio cholerae"}
+    GET  /games/<id>     board state
+    GET  /species?q=stap&limit=10          autocomplete
+    GET  /stats          request and cache counters
+
+Everything but puzzle generation runs on the event loop, so games need no locks.
+Puzzles with their per-cell answer sets, games and autocomplete results are kept in LRU caches.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import secrets
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from data.data_utils import load_game_dataset
+from data.species_search import SpeciesSearch
+from engine.game_engine import GameEngine, GameState, Puzzle
+from engine.puzzle_producer import PuzzleProducer
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+MAX_BODY = 64 * 1024
+
+
+class LRUCache:
+    """
+    Dict with a size bound, the least recently used key is evicted first
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.items.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key, value) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        return {"size": len(self.items), "limit": self.size, "hits": self.hits, "misses": self.misses}
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def get_daily_seed(date: datetime.date) -> int:
+    """
+    Same seed for everyone on a date, not guessable from the previous day's
+    """
+
+    digest = hashlib.sha256(f"microbes-grid-daily-{date.isoformat()}".encode("utf-8")).digest()
+
+    return int.from_bytes(digest[:4], "little")
+
+
+class PuzzleEntry:
+    """
+    Cached puzzle: public JSON and the valid names per cell
+    """
+
+    def __init__(self, puzzle: Puzzle, engine: GameEngine) -> None:
+        self.puzzle = puzzle
+        self.public = puzzle.to_dict(engine.dataset)
+        names_from_mask = engine.dataset.species_index.names_from_mask
+        self.answers = [[frozenset(names_from_mask(mask)) for mask in row] for row in puzzle.intersections]
+
+
+class PuzzleService:
+    """
+    Request handling without the HTTP layer, every method runs on the event loop
+    """
+
+    def __init__(
+        self, engine: GameEngine, pool_size: int = 32, puzzle_cache: int = 1024,
+        game_cache: int = 100000, search_cache: int = 4096,
+    ) -> None:
+        self.engine = engine
+        self.dataset = engine.dataset
+        self.search = SpeciesSearch(self.dataset.all_species)
+        # Generated in a worker thread, requests only pop ready puzzles
+        self.producer = PuzzleProducer(engine, pool_size)
+        # Daily puzzles and pool misses are generated by one more thread on a second engine,
+        # its graph and generator are never used by the producer thread, only the read-only dataset is shared
+        self.generate_engine = GameEngine(
+            engine.dataset, engine.graph.min_common, engine.rows, engine.cols, engine.max_samples
+        )
+        self.generate_executor = ThreadPoolExecutor(1, thread_name_prefix="GeneratePuzzle")
+        # Daily puzzles by seed, and the generations in progress so a seed is generated once
+        self.puzzles = LRUCache(puzzle_cache)
+        self.pending = {}
+        self.games = LRUCache(game_cache)
+        self.completions = LRUCache(search_cache)
+        self.requests = 0
+        self.started = time.time()
+
+    def start(self) -> None:
+        self.producer.start()
+
+    def stop(self) -> None:
+        self.producer.stop()
+        self.generate_executor.shutdown(wait=False)
+
+    async def get_daily_entry(self, seed: int) -> PuzzleEntry:
+        entry = self.puzzles.get(seed)
+        if entry is not None:
+            return entry
+
+        # Requests for a seed that is being generated wait for that generation
+        pending = self.pending.get(seed)
+        if pending is None:
+            pending = asyncio.ensure_future(self.generate_daily(seed))
+            self.pending[seed] = pending
+            pending.add_done_callback(lambda _: self.pending.pop(seed, None))
+
+        # A cancelled request doesn't cancel the generation the others wait for
+        return await asyncio.shield(pending)
+
+    async def generate_daily(self, seed: int) -> PuzzleEntry:
+        # Generation takes milliseconds, kept off the event loop
+        loop = asyncio.get_running_loop()
+        puzzle = await loop.run_in_executor(self.generate_executor, self.generate_engine.generate, seed)
+        entry = PuzzleEntry(puzzle, self.engine)
+        self.puzzles.put(seed, entry)
+
+        return entry
+
+    async def get_pool_entry(self) -> PuzzleEntry:
+        puzzle = self.producer.try_get()
+        if puzzle is None:
+            # Pool drained, generate off the event loop like PuzzleProducer.get does in its caller
+            loop = asyncio.get_running_loop()
+            puzzle = await loop.run_in_executor(self.generate_executor, self.generate_engine.generate)
+
+        return PuzzleEntry(puzzle, self.engine)
+
+    def get_date(self, text: str | None) -> datetime.date:
+        if not text:
+            return datetime.date.today()
+        try:
+            return datetime.date.fromisoformat(text)
+        except ValueError:
+            raise RequestError(400, f"Invalid date {text!r}, expected YYYY-MM-DD") from None
+
+    def get_game(self, game_id: str) -> tuple:
+        game = self.games.get(game_id)
+        if game is None:
+            raise RequestError(404, "Unknown or expired game")
+
+        return game
+
+    def get_game_dict(self, game_id: str, entry: PuzzleEntry, state: GameState) -> dict:
+        return {
+            "game": game_id,
+            "puzzle": entry.public,
+            "answers": state.answers,
+            "attempts": state.attempts,
+            "won": state.is_won(),
+        }
+
+    async def daily(self, query: dict) -> dict:
+        date = self.get_date(query.get("date"))
+        entry = await self.get_daily_entry(get_daily_seed(date))
+
+        return {"date": date.isoformat(), "puzzle": entry.public}
+
+    async def new_game(self, body: dict) -> dict:
+        mode = body.get("mode", "new")
+        if mode == "daily":
+            entry = await self.get_daily_entry(get_daily_seed(self.get_date(body.get("date"))))
+        elif mode == "new":
+            entry = await self.get_pool_entry()
+        else:
+            raise RequestError(400, f"Unknown mode {mode!r}, expected 'new' or 'daily'")
+
+        game_id = secrets.token_urlsafe(12)
+        state = GameState(entry.puzzle)
+        self.games.put(game_id, (entry, state))
+
+        return self.get_game_dict(game_id, entry, state)
+
+    def answer(self, game_id: str, body: dict) -> dict:
+        entry, state = self.get_game(game_id)
+        try:
+            row, col, name = int(body["row"]), int(body["col"]), str(body["name"])
+        except (KeyError, TypeError, ValueError):
+            raise RequestError(400, "Answer needs row, col and name") from None
+        if not (0 <= row < len(entry.answers) and 0 <= col < len(entry.answers[0])):
+            raise RequestError(400, f"No cell ({row}, {col})")
+
+        # Same rules as GameEngine.check, against the cached answer sets
+        state.attempts += 1
+        correct = (
+            not state.board.is_filled(row, col)
+            and name in entry.answers[row][col]
+            and not state.is_used(name)
+        )
+        if correct:
+            state.accept(row, col, name, self.dataset.species_index.get_id(name))
+
+        return {
+            "correct": correct,
+            "attempts": state.attempts,
+            "won": state.is_won(),
+            "dead": state.solver.is_dead(),
+        }
+
+    def species(self, query: dict) -> dict:
+        text = query.get("q", "")
+        try:
+            limit = min(max(int(query.get("limit", 20)), 1), 100)
+        except ValueError:
+            raise RequestError(400, "limit must be a number") from None
+
+        key = (text.strip().casefold(), limit)
+        names = self.completions.get(key)
+        if names is None:
+            names = self.search.search(text, limit)
+            self.completions.put(key, names)
+
+        return {"names": names}
+
+    def stats(self) -> dict:
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "species": len(self.dataset.species_index),
+            "pool": self.producer.get_stats(),
+            "caches": {
+                "puzzles": self.puzzles.get_stats(),
+                "games": self.games.get_stats(),
+                "species": self.completions.get_stats(),
+            },
+        }
+
+    async def route(self, method: str, target: str, body: dict) -> dict:
+        """
+        Returns the JSON response of a request, raises RequestError
+        """
+
+        self.requests += 1
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["puzzle", "daily"]:
+            allowed, handler = "GET", lambda: self.daily(query)
+        elif parts == ["games"]:
+            allowed, handler = "POST", lambda: self.new_game(body)
+        elif len(parts) == 2 and parts[0] == "games":
+            allowed = "GET"
+            handler = lambda: self.get_game_dict(parts[1], *self.get_game(parts[1]))
+        elif len(parts) == 3 and parts[0] == "games" and parts[2] == "answer":
+            allowed, handler = "POST", lambda: self.answer(parts[1], body)
+        elif parts == ["species"]:
+            allowed, handler = "GET", lambda: self.species(query)
+        elif parts == ["stats"]:
+            allowed, handler = "GET", self.stats
+        else:
+            raise RequestError(404, f"No endpoint {url.path}")
+
+        if method != allowed:
+            raise RequestError(405, f"{url.path} expects {allowed}")
+
+        result = handler()
+        if asyncio.iscoroutine(result):
+            result = await result
+
+        return result
+
+
+async def read_request(reader: asyncio.StreamReader) -> tuple | None:
+    """
+    Returns (method, target, headers, body bytes), None when the client closed the connection
+    """
+
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise RequestError(413, "Request head too large") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "Malformed request line") from None
+
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        if key:
+            headers[key.strip().lower()] = value.strip()
+
+    length = headers.get("content-length", "") or "0"
+    # Digits only, int() would also take signs, spaces and underscores
+    if not (length.isascii() and length.isdigit()):
+        raise RequestError(400, "Invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise RequestError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+
+    return (method.upper(), target, headers, body)
+
+
+def get_response(status: int, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+
+    return head.encode("latin-1") + body
+
+
+async def handle_connection(service: PuzzleService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    keep_alive = True
+    try:
+        while keep_alive:
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, raw_body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    raise RequestError(400, "Body is not valid JSON") from None
+                if not isinstance(body, dict):
+                    raise RequestError(400, "Body must be a JSON object")
+                status, payload = 200, await service.route(method, target, body)
+            except RequestError as error:
+                status, payload = error.status, {"error": str(error)}
+                # The stream position is unknown after a bad request head
+                keep_alive = keep_alive and status not in (400, 413)
+            except ConnectionError:
+                raise
+            except Exception as error:
+                # Eg. no solvable grid for a pool miss, the client still gets an answer
+                print(f"Request failed: {error!r}", file=sys.stderr)
+                status, payload = 500, {"error": "Internal server error"}
+                keep_alive = False
+
+            writer.write(get_response(status, payload, keep_alive))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: PuzzleService, host: str, port: int) -> None:
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port, backlog=1024
+    )
+    address = server.sockets[0].getsockname()
+    print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbes Grid puzzle service")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address, 0.0.0.0 for the LAN")
+    parser.add_argument("--port", type=int, default=8080, help="port")
+    parser.add_argument("--fast-start", action="store_true", help="load the compact artifact")
+    parser.add_argument("--rows", type=int, default=3, help="grid rows")
+    parser.add_argument("--cols", type=int, default=3, help="grid columns")
+    parser.add_argument("--pool", type=int, default=32, help="puzzles generated ahead")
+    parser.add_argument("--puzzle-cache", type=int, default=1024, help="puzzles kept with their answer sets")
+    parser.add_argument("--game-cache", type=int, default=100000, help="games kept before the oldest are evicted")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    dataset = load_game_dataset(args.fast_start, keep_frame=False)
+    engine = GameEngine(dataset, rows=args.rows, cols=args.cols)
+    service = PuzzleService(engine, args.pool, args.puzzle_cache, args.game_cache)
+    service.start()
+
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
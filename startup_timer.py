@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Reference point, this module is imported first by the entry script
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """
+    Records named startup phases and prints a breakdown
+    Enable with --startup-report or MICROBES_GRID_STARTUP_REPORT=1
+    MICROBES_GRID_STARTUP_BUDGET_MS sets the cold start budget to check against
+    """
+
+    def __init__(self, enabled: bool = False, budget_ms: float | None = None) -> None:
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.phases = []
+
+    @classmethod
+    def from_environment(cls, argv: list) -> "StartupTimer":
+        enabled = "--startup-report" in argv or os.environ.get(
+            "MICROBES_GRID_STARTUP_REPORT"
+        ) == "1"
+        budget = os.environ.get("MICROBES_GRID_STARTUP_BUDGET_MS")
+
+        return cls(enabled, float(budget) if budget else None)
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        modules_before = len(sys.modules)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases.append((name, elapsed, len(sys.modules) - modules_before))
+
+    def report(self) -> None:
+        """
+        Prints time per phase, modules imported per phase and the total since process start
+        """
+
+        if not self.enabled:
+            return
+
+        total_ms = (time.perf_counter() - PROCESS_START) * 1000
+        measured_ms = sum(phase[1] for phase in self.phases) * 1000
+
+        print("Startup breakdown:")
+        for name, elapsed, modules in self.phases:
+            print(f"  {name:<28}{elapsed * 1000:>9.1f} ms  (+{modules} modules)")
+        print(f"  {'other':<28}{total_ms - measured_ms:>9.1f} ms")
+        print(f"  {'total':<28}{total_ms:>9.1f} ms")
+        print(f"  pandas loaded: {'pandas' in sys.modules}, modules: {len(sys.modules)}")
+
+        if self.budget_ms is not None:
+            status = "OK" if total_ms <= self.budget_ms else "OVER BUDGET"
+            print(f"  budget {self.budget_ms:.0f} ms: {status}")
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def frame(tmp_path_factory):
+    """
+    The bundled sheet, parsed into a cache directory of its own
+    """
+
+    pytest.importorskip("pandas")
+    from data.data_utils import get_dataset
+
+    mp = pytest.MonkeyPatch()
+    mp.setenv("MICROBES_GRID_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+    yield get_dataset()
+    mp.undo()
@@ -0,0 +1,112 @@
+import random
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from data.game_dataset import GameDataset
+from data.property_rules import PropertyRules
+from engine.board_solver import BoardSolver
+from engine.game_engine import GameEngine, Puzzle
+from engine.matching import is_solvable
+
+# Rows Motile, Spore former; columns Aerobic, Pigmented
+# Only Omnia fits the Spore former x Pigmented cell, it also fits every other cell
+TRAITS = {
+    "Omnia": ("Yes", "Yes", "Yes", "Yes"),
+    "Alpha": ("Yes", "No", "Yes", "No"),
+    "Beta": ("Yes", "No", "No", "Yes"),
+    "Gamma": ("No", "Yes", "Yes", "No"),
+    "Delta": ("Yes", "Yes", "Yes", "No"),
+}
+COLUMNS = ["Motile", "Spore Former", "Aerobic", "Pigmented"]
+RULES = {"min_count": 1, "skip_columns": ["Genus", "Species"]}
+ROUNDS = 50
+
+
+@pytest.fixture
+def engine():
+    df = pd.DataFrame(
+        [("Testus", name, *traits) for name, traits in TRAITS.items()], columns=["Genus", "Species", *COLUMNS]
+    )
+    dataset = GameDataset(df, PropertyRules(RULES))
+    dataset.get_properties()
+    engine = GameEngine(dataset, min_common=1, rows=2, cols=2)
+
+    ids = {label: i for i, (label, _) in enumerate(dataset.properties)}
+    col_ids = [ids["Aerobic:\nYes"], ids["Pigmented:\nYes"]]
+    row_ids = [ids["Motile:\nYes"], ids["Spore Former:\nYes"]]
+    engine.start(Puzzle(None, col_ids, row_ids, dataset))
+
+    return engine
+
+
+def test_using_the_only_answer_elsewhere_kills_the_board(engine):
+    assert not engine.is_dead()
+    assert engine.count_completions() > 0
+
+    assert engine.check(0, 0, "Testus Omnia")
+    assert engine.is_dead()
+    assert engine.count_completions() == 0
+    assert engine.hint() is None
+
+
+def test_a_correct_answer_that_keeps_the_board_alive(engine):
+    assert engine.check(0, 0, "Testus Delta")
+    assert not engine.is_dead()
+    # Used names and filled cells are refused
+    assert not engine.check(1, 0, "Testus Delta")
+    assert not engine.check(0, 0, "Testus Alpha")
+
+
+def test_hint_keeps_the_board_solvable(engine):
+    # Omnia is the only answer of the last cell, hints elsewhere must not spend her
+    assert engine.hint(1, 1) == (1, 1, "Testus Omnia")
+
+    while not engine.state.is_won():
+        row, col, name = engine.hint()
+        assert engine.check(row, col, name)
+        assert not engine.is_dead()
+
+
+def test_hint_on_random_games_leads_to_a_win(frame):
+    dataset = GameDataset(frame)
+    dataset.get_properties()
+    engine = GameEngine(dataset)
+    rng = random.Random(0)
+
+    for seed in range(ROUNDS):
+        engine.new_game(seed)
+        # Some random correct answers first, the board may stay alive or die
+        for _ in range(rng.randint(0, 4)):
+            row, col = rng.randrange(3), rng.randrange(3)
+            names = dataset.species_index.names_from_mask(engine.state.puzzle.intersections[row][col])
+            engine.check(row, col, rng.choice(names))
+
+        if engine.is_dead():
+            assert engine.hint() is None
+            continue
+        while not engine.state.is_won():
+            row, col, name = engine.hint()
+            assert engine.check(row, col, name)
+            assert not engine.is_dead()
+
+
+def test_incremental_solver_matches_a_fresh_solve():
+    rng = random.Random(2)
+    for _ in range(200):
+        intersections = [[rng.getrandbits(8) & rng.getrandbits(8) for _ in range(3)] for _ in range(3)]
+        solver = BoardSolver(intersections)
+        open_cells = [(row, col) for row in range(3) for col in range(3)]
+        used = 0
+
+        while open_cells and not solver.is_dead():
+            cell = open_cells.pop(rng.randrange(len(open_cells)))
+            options = solver.get_options(cell)
+            if not options:
+                break
+            species_id = rng.choice([i for i in range(8) if options >> i & 1])
+            solver.fill(*cell, species_id)
+            used |= 1 << species_id
+
+            remaining = [intersections[row][col] & ~used for row, col in open_cells]
+            assert solver.is_dead() == (not is_solvable(remaining))
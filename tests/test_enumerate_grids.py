@@ -0,0 +1,89 @@
+import os
+import random
+from itertools import combinations
+import pytest
+from engine.enumerate_grids import build_catalogue, get_record_struct
+from engine.matching import is_solvable
+
+SIZE = 3
+MIN_COMMON = 2
+FINGERPRINT = "0" * 64
+
+
+class Interrupted(Exception):
+    pass
+
+
+def get_properties(count=11, species=10, seed=0):
+    """
+    Small enough for brute force, dense enough that some grids fit by counts but have no matching
+    """
+
+    rng = random.Random(seed)
+    masks = [rng.getrandbits(species) | rng.getrandbits(species) & rng.getrandbits(species) for _ in range(count)]
+
+    return [(f"p{i}", mask) for i, mask in enumerate(masks)]
+
+
+def brute_force_grids(properties):
+    """
+    Every valid grid as frozenset({columns, rows}), so row order, column order and transpose don't matter
+    """
+
+    masks = [mask for _, mask in properties]
+    grids = set()
+    for col_ids in combinations(range(len(masks)), SIZE):
+        rest = [i for i in range(len(masks)) if i not in col_ids]
+        for row_ids in combinations(rest, SIZE):
+            cell_masks = [masks[row] & masks[col] for row in row_ids for col in col_ids]
+            if all(mask.bit_count() >= MIN_COMMON for mask in cell_masks) and is_solvable(cell_masks):
+                grids.add(frozenset((col_ids, row_ids)))
+
+    return grids
+
+
+def read_grids(output):
+    record = get_record_struct(SIZE)
+    with open(os.path.join(output, "grids.bin"), "rb") as file:
+        data = file.read()
+
+    return [record.unpack_from(data, offset) for offset in range(0, len(data), record.size)]
+
+
+def test_catalogue_matches_brute_force(tmp_path):
+    properties = get_properties()
+    expected = brute_force_grids(properties)
+    assert expected
+
+    count = build_catalogue(str(tmp_path), properties, FINGERPRINT, SIZE, MIN_COMMON, 1, report=lambda line: None)
+    grids = [frozenset((values[:SIZE], values[SIZE : 2 * SIZE])) for values in read_grids(str(tmp_path))]
+
+    assert count == len(grids) == len(expected)
+    # Each class once
+    assert set(grids) == expected
+
+
+def test_interrupted_run_resumes_to_the_same_catalogue(tmp_path):
+    properties = get_properties()
+    clean = str(tmp_path / "clean")
+    build_catalogue(clean, properties, FINGERPRINT, SIZE, MIN_COMMON, 1, report=lambda line: None)
+
+    def interrupt(line):
+        if "column" in line:
+            raise Interrupted()
+
+    resumed = str(tmp_path / "resumed")
+    with pytest.raises(Interrupted):
+        build_catalogue(resumed, properties, FINGERPRINT, SIZE, MIN_COMMON, 1, report=interrupt)
+    parts = os.listdir(os.path.join(resumed, "parts"))
+    assert 0 < len(parts) < len(properties)
+    assert not os.path.exists(os.path.join(resumed, "grids.bin"))
+
+    lines = []
+    build_catalogue(resumed, properties, FINGERPRINT, SIZE, MIN_COMMON, 1, report=lines.append)
+    assert lines[0] == f"{len(parts)} of {len(properties)} tasks already done"
+
+    with open(os.path.join(clean, "grids.bin"), "rb") as file:
+        expected = file.read()
+    with open(os.path.join(resumed, "grids.bin"), "rb") as file:
+        assert file.read() == expected
@@ -0,0 +1,89 @@
+import copy
+import random
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from data.game_dataset import GameDataset
+from data.property_rules import DEFAULT_RULES, PropertyRules
+
+# Default rules plus a quantile and a combined rule, both have to follow every update
+SPEC = copy.deepcopy(DEFAULT_RULES)
+SPEC["derived"] = [
+    {"label": "GC top quarter", "where": {"col": "GC Content", "quantile": [0.75, 1]}},
+    {"label": "Rod, not pigmented", "where": {"and": [{"col": "Shape", "eq": "Rod"}, {"col": "Pigment Production", "eq": "No"}]}},
+]
+ROUNDS = 30
+
+
+def build(df):
+    dataset = GameDataset(df, PropertyRules(SPEC))
+    dataset.get_properties()
+
+    return dataset
+
+
+def rebuild(dataset):
+    """
+    Fresh dataset from the current trait table, same species IDs
+    """
+
+    records = [dataset.traits.get_record(i) for i in range(len(dataset.species_index))]
+
+    return build(pd.DataFrame(records, columns=dataset.columns, dtype=object))
+
+
+def get_changes(dataset, rng, round_index):
+    names = dataset.species_index.names
+    removed = rng.sample(names, rng.randint(0, 5))
+    kept = [name for name in names if name not in set(removed)]
+
+    modified = {}
+    for name in rng.sample(kept, rng.randint(0, 10)):
+        record = dict(dataset.get_species_record(name))
+        for col in rng.sample([col for col in dataset.columns if col not in ("Genus", "Species")], 3):
+            if col == "GC Content":
+                record[col] = rng.choice([None, rng.randint(20, 75)])
+            else:
+                record[col] = rng.choice(dataset.traits.values[dataset.columns.index(col)])
+        if rng.random() < 0.2:
+            record["Species"] = f"renamed{round_index}x{len(modified)}"
+        modified[name] = record
+
+    added = []
+    for index in range(rng.randint(0, 5)):
+        record = dict(dataset.get_species_record(rng.choice(kept)))
+        record["Species"] = f"added{round_index}x{index}"
+        added.append(record)
+
+    return (added, removed, modified)
+
+
+def test_incremental_updates_match_rebuild(frame):
+    rng = random.Random(0)
+    dataset = build(frame)
+
+    for round_index in range(ROUNDS):
+        added, removed, modified = get_changes(dataset, rng, round_index)
+        dataset.apply_changes(added, removed, modified)
+        fresh = rebuild(dataset)
+
+        assert dataset.species_index.names == fresh.species_index.names
+        assert dataset.all_species == fresh.all_species
+        assert dataset.properties == fresh.properties
+        assert dataset.get_fingerprint() == fresh.get_fingerprint()
+
+        fresh.build_membership_index()
+        assert dataset.rule_masks == fresh.rule_masks
+        for col, masks in dataset.value_masks.items():
+            # Values nobody has anymore keep an empty mask in the index
+            assert {value: mask for value, mask in masks.items() if mask} == fresh.value_masks[col]
+
+
+def test_remove_species_rejects_unknown_names(frame):
+    dataset = build(frame)
+    dataset.build_membership_index()
+
+    with pytest.raises(KeyError):
+        dataset.remove_species([dataset.species_index.names[0], "Nonexistent species"])
+    assert len(dataset.species_index) == len(frame)
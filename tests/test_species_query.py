@@ -0,0 +1,23 @@
+import pytest
+
+from data.game_dataset import GameDataset
+from data.property_rules import PropertyRules
+from data.species_query import SpeciesQuery
+
+
+@pytest.fixture(scope="module")
+def query(frame):
+    dataset = GameDataset(frame, PropertyRules())
+    dataset.get_properties()
+
+    return SpeciesQuery(dataset)
+
+
+def test_numeric_comparison(query):
+    assert query.count("GC Content < 40") == query.count("NOT GC Content >= 40")
+
+
+@pytest.mark.parametrize("text", ["Shape < 3", "Shape >= Rod", "Gram Stain > 1"])
+def test_comparison_on_categorical_column(query, text):
+    with pytest.raises(ValueError, match="not numeric"):
+        query.search(text)
@@ -1,6 +1,7 @@
 import tkinter as tk
-from ttkwidgets.autocomplete import AutocompleteCombobox
-from typing import Callable
+from data.species_search import SpeciesSearch
+from instrumentation import INSTRUMENTS, timed
+from .species_picker import SpeciesPicker
 from .ui_utils import get_restart_button, get_label, get_gamefield_button, get_info_button, center_window
 
 
@@ -11,9 +12,24 @@ class GameInterface:
         self.text_info_centre = 'Info Centre'
         self.label_font = ("Arial", 18)
         self.button_font = ("Arial", 14, "italic")
+        # Built once, shared by every species picker
+        self.species_search = SpeciesSearch(self.game.dataset.all_species)
+        # Widgets are created once and relabeled on restart
+        self.col_labels = []
+        self.row_labels = []
+        self.game_buttons = []
 
         self.create_root_and_frame()
+        # One hidden picker window, shown again for every cell and Info Centre click
+        self.species_picker = SpeciesPicker(self.root, self.species_search)
         self.get_labels_cells_game_cells()
+
+        if self.game.watcher is not None:
+            self.root.after(1000, self.check_dataset_updates)
+
+        # Profile snapshot while running, eg. right after a slow Restart
+        if INSTRUMENTS.enabled:
+            self.root.bind("<F12>", lambda event: INSTRUMENTS.dump())
         
     def main_loop(self) -> None:
         self.root.mainloop()
@@ -34,7 +50,7 @@ class GameInterface:
 
     def get_labels_cells_game_cells(self) -> None:
         """
-        Creates full game field in grid form: restart button, col-row labels, 9 guess button, info centre button
+        Creates full game field in grid form: restart button, col-row labels, guess buttons, info centre button
         """
 
         # Add restart button
@@ -45,6 +61,7 @@ class GameInterface:
         for col_index, col_prop in enumerate(self.game.cols):
             label = get_label(self.frame, self.label_font, col_prop)
             label.grid(row=0, column=col_index + 1, padx=10, pady=10)
+            self.col_labels.append(label)
             
         cols_count = len(self.game.cols)
         
@@ -52,30 +69,73 @@ class GameInterface:
         for row_index, row_prop in enumerate(self.game.rows):
             label = get_label(self.frame, self.label_font, row_prop)
             label.grid(row=row_index + 1, column=0, padx=10, pady=10)
+            self.row_labels.append(label)
 
             # Grid cells
             for col_index in range(cols_count):
                 button = get_gamefield_button(self, self.frame, self.button_font, self.text_unknown, cols_count, col_index, row_index)
                 button.grid(row=row_index + 1, column=col_index + 1, padx=10, pady=10)
+                self.game_buttons.append(button)
             
-        info_button = get_info_button(self.frame, self.button_font, self.input_combobox_events, self.text_info_centre)
-        info_button.grid(row=4, column=0, padx=10, pady=10)
+        info_button = get_info_button(self.frame, self.button_font, self.open_species_picker, self.text_info_centre)
+        # Bottom row below the grid
+        bottom_row = len(self.game.rows) + 1
+        info_button.grid(row=bottom_row, column=0, padx=10, pady=10)
+
+        hint_button = get_info_button(self.frame, self.button_font, self.display_hint, "Hint")
+        hint_button.grid(row=bottom_row, column=1, padx=10, pady=10)
+
+        query_button = get_info_button(self.frame, self.button_font, self.display_query, "Query")
+        query_button.grid(row=bottom_row, column=2, padx=10, pady=10)
         
         self.attempt_label = tk.Label(self.frame, text=f'Attempts: {self.game.attempts}', font=self.button_font)
-        self.attempt_label.grid(row=4, column=3, padx=10, pady=10)
+        self.attempt_label.grid(row=bottom_row, column=max(cols_count, 3), padx=10, pady=10)
 
+    @timed("ui.restart")
     def reset_ui(self) -> None:
         """
         Resets ui and variables
-        Generates a new game
+        Takes a pre-generated game, reuses the existing widgets
         """
 
-        for widget in self.frame.winfo_children():
-            widget.destroy()
-
-        # Generate new random game in main file
+        # New game from the background queue in main file
         self.game.restart_game()
-        self.get_labels_cells_game_cells()
+        self.relabel_game_cells()
+
+    @timed("ui.dataset_poll")
+    def check_dataset_updates(self) -> None:
+        """
+        Polls the dataset watcher, edits rebuild the search index and start a new game
+        """
+
+        if self.game.apply_dataset_updates():
+            self.species_search = SpeciesSearch(self.game.dataset.all_species)
+            self.species_picker.set_search(self.species_search)
+            self.relabel_game_cells()
+
+        self.root.after(1000, self.check_dataset_updates)
+
+    def relabel_game_cells(self) -> None:
+        """
+        Updates labels and resets grid cells for the current game
+        """
+
+        # An open picker belongs to a cell of the previous game
+        self.species_picker.hide()
+
+        for label, col_prop in zip(self.col_labels, self.game.cols):
+            label.config(text=col_prop[0])
+
+        for label, row_prop in zip(self.row_labels, self.game.rows):
+            label.config(text=row_prop[0])
+
+        cols_count = len(self.game.cols)
+
+        for button_index, button in enumerate(self.game_buttons):
+            button.config(text=self.text_unknown, bg="lightgray", height=2, pady=20)
+            self.game.register_gamefield(button, button_index // cols_count, button_index % cols_count)
+
+        self.attempt_label.config(text=f'Attempts: {self.game.attempts}')
 
     def create_toplevel_window(
         self, width: int, height: int, title: str
@@ -97,68 +157,25 @@ class GameInterface:
 
         return toplevel_window
 
-    def create_combobox(self) -> dict:
-        """
-        Creates combobox (search bar + drop-down ) for search
-        """
-
-        # Create a new top-level window for the Combobox
-        combobox_window = self.create_toplevel_window(300, 60, "Select Species")
-
-        # Create the Combobox
-        combobox = AutocompleteCombobox(
-            combobox_window, completevalues=self.game.dataset.all_species
-        )
-        combobox.pack(padx=10, pady=10, fill=tk.X)
-
-        return {"window": combobox_window, "combobox": combobox}
-
     # Event handling
 
-    def bind_enter_event_function(
-        self, combobox: AutocompleteCombobox, func: Callable
-    ) -> None:
+    @timed("ui.open_picker")
+    def open_species_picker(self, button: tk.Button = None) -> None:
         """
-        Binds functions for input events (click and Enter)
-        """
-
-        combobox.bind("<<ComboboxSelected>>", func)
-        combobox.bind("<Return>", func)
-
-        combobox.focus()
-
-    def input_combobox_events(self, button: tk.Button = None) -> None:
-        """
-        Creates combobox only if cell has no answer yet
-        Handles input events in combobox
+        Shows the species picker only if cell has no answer yet
+        The picked name is checked for the cell, or shown in Info Centre
         """
 
         # For gamefield buttons
         if button is not None:
-            button_text = button.cget("text")
-
             # Disable clicking after successful guess
-            if button_text != self.text_unknown:
+            if self.game.is_answered(button):
                 return
 
-        combobox = self.create_combobox()
-
-        # Enter event
-        def on_enter(event: tk.Event) -> None:
-            selected_value = combobox["combobox"].get()
-            if selected_value:
-                # Only None is Info centre
-                if button is None:
-                    self.display_species_info(selected_value)
-                # Gamefields buttons
-                else:
-                    self.user_input_feedback(selected_value, button)
-
-            # Close combobox window
-            combobox["window"].destroy()
-
-        # Bind function to combobox
-        self.bind_enter_event_function(combobox["combobox"], on_enter)
+            self.species_picker.open(lambda name: self.user_input_feedback(name, button), button)
+        # Only None is Info centre
+        else:
+            self.species_picker.open(self.display_species_info)
 
     
     def display_win(self) -> None:
@@ -189,6 +206,7 @@ class GameInterface:
         ).pack()
 
     
+    @timed("ui.guess")
     def user_input_feedback(
         self, selected_value: str, button: tk.Button
     ) -> None:
@@ -200,31 +218,114 @@ class GameInterface:
         Checks win
         """
 
-        # Count attempts
-        self.game.attempts += 1
-        self.attempt_label.config(text=f'Attempts: {self.game.attempts}')
-
         # Calculate the button's row and column index
         row_index, col_index = self.game.get_gamefield_position(button)
 
-        # Get the intersections related to this row and column combination
-        intersections = self.game.intersections[row_index][col_index]
+        # Check if the selected value exists in the intersection for this position and is not used yet
+        # Counts the attempt too
+        is_correct = self.game.check_answer(row_index, col_index, selected_value)
+        self.attempt_label.config(text=f'Attempts: {self.game.attempts}')
 
-        # Check if the selected value exists in the intersections for this position
-        if selected_value not in intersections or self.game.is_existing_value(selected_value):
+        if not is_correct:
             # Change background to red
             button.config(bg="red")
             # 1 sec later background change to default
             self.reset_button_bg_delayed(button)
         else:
-            # Add linebreak for better display
+            rarity = self.game.record_answer(row_index, col_index, selected_value)
+            # Add linebreak for better display, share of players who gave the same answer below
             line_break_name = selected_value.replace(" ", "\n")
             # Change button text to input
-            button.config(text=line_break_name)
+            if rarity is None:
+                button.config(text=line_break_name)
+            else:
+                # Third line takes the place of some padding, the cell keeps its size
+                button.config(text=f"{line_break_name}\n{rarity['share']:.0%} of answers", height=3, pady=9)
 
-            if self.game.check_win(self.text_unknown):
+            if self.game.check_win():
                 self.display_win()
 
+    @timed("ui.hint")
+    def display_hint(self) -> None:
+        """
+        Creates top level window with the rarest valid species for the most constrained open cell
+        Highlights the cell for a second
+        """
+
+        hint = self.game.get_hint()
+
+        if hint is not None:
+            row_index, col_index, name = hint
+            row_text = self.game.rows[row_index][0].replace("\n", " ")
+            col_text = self.game.cols[col_index][0].replace("\n", " ")
+            text = f"{row_text} + {col_text}:\n{name}"
+
+            button = self.game_buttons[row_index * len(self.game.cols) + col_index]
+            button.config(bg="khaki")
+            self.reset_button_bg_delayed(button)
+        elif self.game.is_dead():
+            text = "No way left to finish this board"
+        else:
+            text = "No open cell left"
+
+        hint_window = self.create_toplevel_window(460, 120, "Hint")
+        tk.Label(hint_window, text=text, font=("Arial", 14), justify="center", padx=10, pady=10).pack()
+
+    @timed("ui.query")
+    def display_query(self) -> None:
+        """
+        Creates top level window for trait queries, eg. 'Gram Stain: Negative AND Shape: Rod'
+        Results are paged, double click shows the species info
+        """
+
+        query_window = self.create_toplevel_window(460, 560, "Species Query")
+        page = {"offset": 0, "count": 0}
+        page_size = 50
+
+        entry = tk.Entry(query_window, font=("Arial", 12))
+        entry.pack(padx=10, pady=(10, 5), fill=tk.X)
+        status_label = tk.Label(query_window, text="AND / OR / NOT, eg. Shape: Rod AND GC Content > 50", font=("Arial", 10), anchor="w")
+        status_label.pack(padx=10, fill=tk.X)
+        result_list = tk.Listbox(query_window, font=("Arial", 12))
+        result_list.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+        page_frame = tk.Frame(query_window)
+        page_frame.pack(pady=(0, 10))
+
+        def show_page(offset: int) -> None:
+            try:
+                result = self.game.query_species(entry.get(), offset, page_size)
+            except ValueError as error:
+                status_label.config(text=str(error))
+                return
+
+            page["offset"], page["count"] = offset, result["count"]
+            result_list.delete(0, tk.END)
+            result_list.insert(tk.END, *result["names"])
+            last = min(offset + page_size, result["count"])
+            status_label.config(text=f"{result['count']} species, {offset + 1 if last else 0}-{last} shown")
+
+        def on_select(event: tk.Event) -> None:
+            selection = result_list.curselection()
+            if selection:
+                self.display_species_info(result_list.get(selection[0]))
+
+        def next_page() -> None:
+            if page["offset"] + page_size < page["count"]:
+                show_page(page["offset"] + page_size)
+
+        tk.Button(
+            page_frame, text="< Prev", width=8,
+            command=lambda: show_page(max(page["offset"] - page_size, 0)),
+        ).pack(side=tk.LEFT, padx=5)
+        tk.Button(
+            page_frame, text="Next >", width=8,
+            command=next_page,
+        ).pack(side=tk.LEFT, padx=5)
+
+        entry.bind("<Return>", lambda event: show_page(0))
+        result_list.bind("<Double-Button-1>", on_select)
+        entry.focus()
+
     def reset_button_bg_delayed(self, button: tk.Button) -> None:
         """
         Changes back buttons background to default with delay
@@ -232,19 +333,17 @@ class GameInterface:
 
         button.after(1000, lambda: button.config(bg="lightgray"))
 
+    @timed("ui.species_info")
     def display_species_info(self, name: str) -> None:
         """
         Creates top level window for info centre display
         Displays all information of choosen bacteria
         """
 
-        # Split name into Genus and Species
-        name_cols = name.split(" ")
-
-        # Filter the DataFrame based on Genus and Species
-        name_row = self.game.dataset.df[
-            (self.game.dataset.df["Genus"] == name_cols[0]) & (self.game.dataset.df["Species"] == name_cols[1])
-        ]
+        # Whole record in one lookup by full name, species epithets may contain spaces
+        record = self.game.dataset.get_species_record(name)
+        if record is None:
+            return
 
         # Create a new top-level window for info view
         info_window = self.create_toplevel_window(400, 680, f"Details for {name}")
@@ -253,15 +352,16 @@ class GameInterface:
         frame = tk.Frame(info_window)
         frame.pack(padx=10, pady=10, anchor="w")
 
-        # Loop through the dataframe columns and display key-value pairs in a table format
-        for i, col in enumerate(self.game.dataset.df.columns):
+        # Loop through the record and display key-value pairs in a table format
+        for i, (col, value) in enumerate(record.items()):
             # Column name
             tk.Label(
                 frame, text=f"{col}:", font=("Arial", 12, "bold"), anchor="w"
             ).grid(row=i, column=0, sticky="w", padx=5, pady=2)
 
-            # Value
-            value = name_row.iloc[0][col]
+            # Value, missing values shown as '-'
+            if value is None:
+                value = "-"
             tk.Label(frame, text=value, font=("Arial", 12), anchor="w").grid(
                 row=i, column=1, sticky="w", padx=5, pady=2
             )
@@ -0,0 +1,302 @@
+import queue
+import threading
+import tkinter as tk
+from typing import Callable
+from data.species_search import SpeciesSearch
+from instrumentation import timed
+from .ui_utils import center_window
+
+# Wait after the last keystroke before searching
+DEBOUNCE_MS = 120
+# How often finished searches are picked up from the worker thread
+POLL_MS = 15
+RESULT_LIMIT = 500
+VISIBLE_ROWS = 12
+
+
+class VirtualList(tk.Frame):
+    """
+    Listbox showing rows visible items of a list of any length
+    Only the visible names are handed to Tk, scrolling swaps them
+    """
+
+    def __init__(self, master: tk.Misc, rows: int = VISIBLE_ROWS, **kwargs) -> None:
+        super().__init__(master)
+        self.rows = rows
+        self.items = []
+        # Index of the first visible item and of the selected one
+        self.first = 0
+        self.selected = None
+
+        self.listbox = tk.Listbox(self, height=rows, exportselection=False, activestyle="none", **kwargs)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.listbox.bind("<<ListboxSelect>>", self.on_listbox_select)
+        # Windows and macOS send <MouseWheel>, X11 buttons 4 and 5
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll_wheel(-1 if event.delta > 0 else 1))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll_wheel(-1))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll_wheel(1))
+
+    def set_items(self, items: list, selected: int | None = None) -> None:
+        """
+        Items are kept by reference, a list of all species costs the same as a short one
+        """
+
+        self.items = items
+        self.first = 0
+        self.selected = selected
+        self.render()
+
+    def render(self) -> None:
+        self.listbox.delete(0, tk.END)
+        visible = self.items[self.first : self.first + self.rows]
+        if visible:
+            self.listbox.insert(0, *visible)
+
+        if self.selected is not None and self.first <= self.selected < self.first + self.rows:
+            self.listbox.selection_set(self.selected - self.first)
+
+        if self.items:
+            self.scrollbar.set(self.first / len(self.items), min(1.0, (self.first + self.rows) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, first: int) -> None:
+        first = max(0, min(first, len(self.items) - self.rows))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def scroll_wheel(self, direction: int) -> str:
+        self.scroll_to(self.first + 3 * direction)
+
+        return "break"
+
+    def on_scrollbar(self, *args) -> None:
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.items)))
+        elif args[0] == "scroll":
+            step = self.rows if args[2] == "pages" else 1
+            self.scroll_to(self.first + int(args[1]) * step)
+
+    def on_listbox_select(self, event: tk.Event) -> None:
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.first + selection[0]
+
+    def move_selection(self, delta: int) -> str:
+        """
+        Moves the selection by delta items, scrolling it into view
+        """
+
+        if self.items:
+            current = -1 if self.selected is None else self.selected
+            self.selected = max(0, min(current + delta, len(self.items) - 1))
+            if self.selected < self.first:
+                self.first = self.selected
+            elif self.selected >= self.first + self.rows:
+                self.first = self.selected - self.rows + 1
+            self.render()
+
+        return "break"
+
+    def get_selected(self) -> str | None:
+        if self.selected is None or self.selected >= len(self.items):
+            return None
+
+        return self.items[self.selected]
+
+
+class SpeciesPicker:
+    """
+    Species search window, created once and hidden, open() shows it again next to the clicked cell
+    Typing is debounced and searched in a worker thread, results go to a VirtualList,
+    so opening and filtering don't depend on the species count
+    """
+
+    def __init__(self, root: tk.Tk, search: SpeciesSearch, width: int = 300, height: int = 320) -> None:
+        self.root = root
+        self.search = search
+        self.width = width
+        self.height = height
+        # Called with the picked name, None while hidden
+        self.on_pick = None
+        self.debounce_id = None
+        # Results of older searches than generation are dropped
+        self.generation = 0
+        self.requested = 0
+        self.answered = 0
+        self.polling = False
+        self.shown_text = ""
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="SpeciesPicker", daemon=True)
+        self.thread.start()
+
+        self.create_window()
+
+    def create_window(self) -> None:
+        self.window = tk.Toplevel(self.root)
+        self.window.withdraw()
+        self.window.title("Select Species")
+        self.window.transient(self.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        self.text = tk.StringVar()
+        self.entry = tk.Entry(self.window, textvariable=self.text, font=("Arial", 12))
+        self.entry.pack(padx=10, pady=(10, 5), fill=tk.X)
+        self.status_label = tk.Label(self.window, font=("Arial", 10), anchor="w")
+        self.status_label.pack(padx=10, fill=tk.X)
+        self.result_list = VirtualList(self.window, font=("Arial", 12))
+        self.result_list.pack(padx=10, pady=(5, 10), fill=tk.BOTH, expand=True)
+
+        self.text.trace_add("write", self.on_text_change)
+        for sequence in ("<Return>", "<KP_Enter>"):
+            self.entry.bind(sequence, self.pick)
+            self.result_list.listbox.bind(sequence, self.pick)
+        self.result_list.listbox.bind("<Double-Button-1>", self.pick)
+        self.entry.bind("<Down>", lambda event: self.result_list.move_selection(1))
+        self.entry.bind("<Up>", lambda event: self.result_list.move_selection(-1))
+        self.entry.bind("<Next>", lambda event: self.result_list.move_selection(self.result_list.rows))
+        self.entry.bind("<Prior>", lambda event: self.result_list.move_selection(-self.result_list.rows))
+        self.window.bind("<Escape>", lambda event: self.hide())
+
+    def open(self, on_pick: Callable, anchor: tk.Widget | None = None) -> None:
+        """
+        Shows the window below anchor (centered without one), on_pick gets the chosen name
+        """
+
+        self.on_pick = on_pick
+        # Empty query lists all species without a search
+        self.text.set("")
+
+        position_left, position_top = self.get_position(anchor)
+        self.window.geometry(f"{self.width}x{self.height}+{position_left}+{position_top}")
+        self.window.deiconify()
+        self.window.lift()
+        self.entry.focus_set()
+
+    def hide(self) -> None:
+        if self.debounce_id is not None:
+            self.root.after_cancel(self.debounce_id)
+            self.debounce_id = None
+        self.on_pick = None
+        self.window.withdraw()
+
+    def set_search(self, search: SpeciesSearch) -> None:
+        """
+        Swaps the index after a dataset update, an open window is filtered again
+        """
+
+        self.search = search
+        if self.on_pick is not None:
+            self.on_text_change()
+
+    def get_position(self, anchor: tk.Widget | None) -> tuple:
+        if anchor is None:
+            return center_window(self.window, self.width, self.height)
+
+        screen_width = self.window.winfo_screenwidth()
+        screen_height = self.window.winfo_screenheight()
+        position_left = min(anchor.winfo_rootx(), screen_width - self.width)
+        position_top = anchor.winfo_rooty() + anchor.winfo_height()
+        # Above the cell when there's no room below
+        if position_top + self.height > screen_height:
+            position_top = anchor.winfo_rooty() - self.height
+
+        return (max(0, position_left), max(0, position_top))
+
+    # Filtering
+
+    def on_text_change(self, *args) -> None:
+        if self.debounce_id is not None:
+            self.root.after_cancel(self.debounce_id)
+            self.debounce_id = None
+
+        text = self.text.get().strip()
+        if not text:
+            self.generation += 1
+            self.show(text, self.search.names)
+            return
+
+        self.debounce_id = self.root.after(DEBOUNCE_MS, self.submit, text)
+
+    def submit(self, text: str) -> None:
+        self.debounce_id = None
+        self.generation += 1
+        self.requested = self.generation
+        self.requests.put((self.generation, self.search, text))
+
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.poll)
+
+    def poll(self) -> None:
+        """
+        Takes finished searches on the Tk thread, only the newest is shown
+        """
+
+        while True:
+            try:
+                generation, text, names = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.answered = max(self.answered, generation)
+            if generation == self.generation:
+                self.show(text, names)
+
+        if self.answered < self.requested:
+            self.root.after(POLL_MS, self.poll)
+        else:
+            self.polling = False
+
+    def show(self, text: str, names: list) -> None:
+        self.shown_text = text
+        # Best match preselected, Enter takes it like the old combobox did
+        self.result_list.set_items(names, 0 if text and names else None)
+
+        if not text:
+            status = f"{len(names)} species"
+        elif len(names) >= RESULT_LIMIT:
+            status = f"Best {RESULT_LIMIT} matches"
+        elif names:
+            status = f"{len(names)} matches"
+        else:
+            status = "No match"
+        self.status_label.config(text=status)
+
+    def pick(self, event: tk.Event = None) -> str:
+        text = self.text.get().strip()
+        name = self.result_list.get_selected() if text == self.shown_text else None
+        # Enter before the debounced search finished
+        if name is None:
+            name = self.search.resolve(text)
+
+        on_pick = self.on_pick
+        self.hide()
+        if name is not None and on_pick is not None:
+            on_pick(name)
+
+        return "break"
+
+    # Worker thread
+
+    def run(self) -> None:
+        while True:
+            request = self.requests.get()
+            # Queries typed meanwhile replace the older ones
+            while True:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+
+            generation, search, text = request
+            self.results.put((generation, text, self.find(search, text)))
+
+    @timed("ui.picker_search")
+    def find(self, search: SpeciesSearch, text: str) -> list:
+        return search.search(text, RESULT_LIMIT)
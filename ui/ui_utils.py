@@ -45,10 +45,10 @@ def get_gamefield_button(self, frame: tk.Frame, font: tuple, text: str, cols_cou
         pady=20,
         command=lambda b=col_index + (
             row_index * cols_count
-        ): self.input_combobox_events(self.game.game_fields[b]),
+        ): self.open_species_picker(self.game.game_fields[b]),
     )
     
-    self.game.game_fields.append(gamefield_button)
+    self.game.register_gamefield(gamefield_button, row_index, col_index)
     
     return gamefield_button
 